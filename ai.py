@@ -0,0 +1,213 @@
+"""Computer opponent: a batched search over every shot a player can take.
+
+For each loaded launch site the whole aim envelope (+-ANGLE_LIMIT_DEG,
+MIN_SPEED..MAX_SPEED) is sampled on a coarse grid and every candidate is
+flown at once against where the planets will be (their orbits are exact
+functions of time). Each round after that flies the neighbours of the
+AI_KEEP best candidates so far at half the previous spacing, so the search
+zooms in on the best shots. A candidate scores highly for hitting an enemy
+planet, badly for hitting one of our own, and otherwise by how close it
+came to an enemy. Flights use semi-implicit Euler at AI_DT_SCALE times the
+action-speed tick, whatever the match's integrator: a step is a fixed
+handful of NumPy operations over (body, candidate) arrays, so the budget
+buys thousands of candidates rather than a few hundred.
+
+The search is a generator that yields every few integration steps and stops
+once AI_THINK_BUDGET seconds have been spent in it, so a front end can run
+it a slice per frame (see Game.update_ai) and a headless caller can simply
+run it to the end (SearchAI.plan).
+"""
+import math, time
+import numpy as np
+import settings as cfg
+from gravity import SOFTENING
+from settings import (DT, DEFAULT_TIME_SCALE, ACTION_TIME_SCALE, G, STAR_MASS, STAR_COLLISION_RADIUS,
+                      ANGLE_LIMIT_DEG, MIN_SPEED, MAX_SPEED, AI_THINK_BUDGET, AI_STEPS, AI_DT_SCALE,
+                      AI_COARSE_ANGLES, AI_COARSE_SPEEDS, AI_KEEP, AI_ROUNDS)
+
+HIT_SCORE = 1000.0   # enemy hit (less the target's health); an own-planet hit scores minus this
+YIELD_STEPS = 10     # integration steps between yields
+
+class _Search:
+    """Everything one search needs, frozen at the moment it started."""
+    def __init__(self, world, player, lead, budget):
+        self.budget = budget
+        self.spent = 0.0
+        self.resumed = None
+
+        # the shot leaves on the tick after it is queued, `lead` seconds from now
+        ephem = world.ephemeris
+        self.dt0 = DT * (ACTION_TIME_SCALE if len(world.rockets) else DEFAULT_TIME_SCALE)
+        self.dt = DT * ACTION_TIME_SCALE * AI_DT_SCALE
+        t_launch = lead + self.dt0
+        theta = ephem.theta + math.tau * t_launch / ephem.orbit_period
+        spin = ephem.spin + math.tau * t_launch / ephem.spin_period
+        cx, cy = cfg.CENTER
+
+        # launch frames (x, y, base direction) of the sites that can shoot
+        self.sites, frames = [], []
+        for i, p in enumerate(ephem.planets):
+            if p.owner != player.name or p.shots < 1:
+                continue
+            px = cx + p.orbit_radius * math.cos(theta[i])
+            py = cy + p.orbit_radius * math.sin(theta[i])
+            for s in p.sites:
+                ang = s.angle_on_planet + spin[i]
+                frames.append((px + math.cos(ang) * (p.radius_px + 10),
+                               py + math.sin(ang) * (p.radius_px + 10), ang - math.pi / 2))
+                self.sites.append(s)
+        self.frames = np.array(frames).reshape(-1, 3)
+
+        # body columns, star first, at each flight step k (t_launch + k * dt)
+        k = np.arange(AI_STEPS)[:, None]
+        th = theta + k * (math.tau * self.dt / ephem.orbit_period)
+        self.bx = np.empty((AI_STEPS, len(ephem.planets) + 1))
+        self.by = np.empty((AI_STEPS, len(ephem.planets) + 1))
+        self.bx[:, 0], self.by[:, 0] = cx, cy
+        self.bx[:, 1:] = cx + ephem.orbit_radius * np.cos(th)
+        self.by[:, 1:] = cy + ephem.orbit_radius * np.sin(th)
+
+        # per body, star first: surface radius, whether a near miss counts, hit score
+        enemy = np.array([False] + [p.owner != player.name for p in ephem.planets])
+        health = np.array([0.0] + [p.health for p in ephem.planets])
+        self.radius = np.concatenate(([float(STAR_COLLISION_RADIUS)], ephem.radius))[:, None]
+        self.no_gap = np.where(enemy, 0.0, np.inf)[:, None]
+        self.hit_score = np.where(enemy, HIT_SCORE - health, -HIT_SCORE)
+        self.hit_score[0] = np.nan          # into the star: scored as a miss
+        self.gm = np.concatenate(([G * STAR_MASS], ephem.gm))[:, None]
+
+    def start(self):
+        self.resumed = time.perf_counter()
+
+    def pause(self):
+        self.spent += time.perf_counter() - self.resumed
+
+    def out_of_time(self):
+        return self.spent + time.perf_counter() - self.resumed >= self.budget
+
+class SearchAI:
+    name = "search"
+
+    def __init__(self, budget=AI_THINK_BUDGET, angles=AI_COARSE_ANGLES, speeds=AI_COARSE_SPEEDS,
+                 keep=AI_KEEP, rounds=AI_ROUNDS):
+        self.budget = budget
+        self.angles = angles
+        self.speeds = speeds
+        self.keep = keep
+        self.rounds = rounds
+        self.stats = None      # (candidates flown, rounds, seconds, best score) of the last search
+
+    def think(self, world, player, lead=0.0):
+        """Start searching for `player`'s next shot in `world` (a Simulation
+        or worker.WorldSnapshot), to be queued `lead` sim seconds from now.
+        Returns a generator: iterate it until it stops; its return value is
+        (site, angle offset, speed), or None if no site of `player` can shoot."""
+        return self._search(_Search(world, player, lead, self.budget))
+
+    def plan(self, world, player, lead=0.0):
+        """think() run to the end in one go."""
+        search = self.think(world, player, lead)
+        while True:
+            try:
+                next(search)
+            except StopIteration as done:
+                return done.value
+
+    def choose(self, sim, player, rng):
+        """tournament.py policy interface."""
+        return self.plan(sim, player)
+
+    def _search(self, ctx):
+        ctx.start()
+        if not ctx.sites:
+            return None
+        lim = math.radians(ANGLE_LIMIT_DEG)
+        a, v = np.meshgrid(np.linspace(-lim, lim, self.angles),
+                           np.linspace(MIN_SPEED, MAX_SPEED, self.speeds))
+        n_sites = len(ctx.sites)
+        site = np.repeat(np.arange(n_sites), a.size)
+        off = np.tile(a.ravel(), n_sites)
+        spd = np.tile(v.ravel(), n_sites)
+        da = 2 * lim / max(1, self.angles - 1)
+        dv = (MAX_SPEED - MIN_SPEED) / max(1, self.speeds - 1)
+        ring_a, ring_v = (g.ravel() for g in np.meshgrid((-1, 0, 1), (-1, 0, 1)))
+        ring = (ring_a != 0) | (ring_v != 0)
+        ring_a, ring_v = ring_a[ring], ring_v[ring]
+
+        all_site, all_off, all_spd, all_score = [], [], [], []
+        rounds = 0
+        while True:
+            score = yield from self._fly(ctx, site, off, spd)
+            all_site.append(site); all_off.append(off); all_spd.append(spd); all_score.append(score)
+            rounds += 1
+            if rounds >= self.rounds or ctx.out_of_time():
+                break
+
+            # refine: the 8 neighbours of the best candidates, at half the spacing
+            da, dv = da / 2, dv / 2
+            s_all, o_all, v_all, sc_all = (np.concatenate(x) for x in (all_site, all_off, all_spd, all_score))
+            best = np.argsort(-sc_all, kind="stable")[:self.keep]
+            site = np.repeat(s_all[best], len(ring_a))
+            off = np.clip(np.repeat(o_all[best], len(ring_a)) + np.tile(ring_a * da, len(best)), -lim, lim)
+            spd = np.clip(np.repeat(v_all[best], len(ring_v)) + np.tile(ring_v * dv, len(best)),
+                          MIN_SPEED, MAX_SPEED)
+
+        s_all, o_all, v_all, sc_all = (np.concatenate(x) for x in (all_site, all_off, all_spd, all_score))
+        i = int(np.argmax(sc_all))
+        ctx.pause()
+        self.stats = (len(sc_all), rounds, ctx.spent, float(sc_all[i]))
+        return ctx.sites[s_all[i]], float(o_all[i]), float(v_all[i])
+
+    def _fly(self, ctx, site, off, spd):
+        """Fly candidate shots (site index, angle offset, speed arrays) and
+        return their scores; yields every YIELD_STEPS steps. If the budget runs
+        out mid-flight, shots still flying are scored as misses so far."""
+        n = len(site)
+        x, y, base = ctx.frames[site].T
+        direction = base + off
+        px, py = x.copy(), y.copy()
+        vx, vy = np.cos(direction) * spd, np.sin(direction) * spd
+        score = np.full(n, np.nan)
+        gap = np.full(n, np.inf)         # closest approach to an enemy planet's surface
+        rows = np.arange(n)              # candidate behind each live column
+        live_gap = gap.copy()
+
+        for k in range(AI_STEPS):
+            # (body, candidate) offsets, star first; they serve both the hit
+            # test of where the candidates are and the step that moves them
+            dx = ctx.bx[k, :, None] - px
+            dy = ctx.by[k, :, None] - py
+            r2 = dx * dx + dy * dy + SOFTENING
+            r = np.sqrt(r2)
+            dist = r - ctx.radius
+            np.minimum(live_gap, (dist + ctx.no_gap).min(axis=0), out=live_gap)
+            hit = dist <= 0
+            done = hit.any(axis=0)
+            if done.any():
+                target = hit.argmax(axis=0)[done]
+                score[rows[done]] = ctx.hit_score[target] - 0.1 * k
+            done |= (px < -200) | (px > cfg.WIDTH + 200) | (py < -200) | (py > cfg.HEIGHT + 200)
+
+            h = ctx.dt0 if k == 0 else ctx.dt
+            f = ctx.gm / (r2 * r)
+            vx += (f * dx).sum(axis=0) * h
+            vy += (f * dy).sum(axis=0) * h
+            px += vx * h
+            py += vy * h
+            if done.any():
+                gap[rows[done]] = live_gap[done]
+                live = ~done
+                rows, px, py, vx, vy, live_gap = rows[live], px[live], py[live], vx[live], vy[live], live_gap[live]
+                if len(rows) == 0:
+                    break
+            if k % YIELD_STEPS == YIELD_STEPS - 1:
+                if ctx.out_of_time():
+                    break
+                ctx.pause()
+                yield
+                ctx.start()
+
+        gap[rows] = live_gap
+        miss = np.isnan(score)
+        score[miss] = -gap[miss]
+        return score
@@ -1,30 +1,237 @@
-import os, pygame
-from settings import ASSET_DIR, SOUND_DIR
+"""Image, sound and font loading, plus the in-memory caches built on top.
 
+Decoding is the slow part of startup, so decoded pixels and PCM samples are
+also kept on disk under ASSET_CACHE_DIR, one raw file per asset and
+variant, named after the source file's path, mtime and size and the
+variant (scaled size, pixel format, mixer format). Later launches
+memory-map those files instead of decoding JPEG/PNG/MP3 again; a changed
+source file simply gets a new cache file. Assets that aren't needed for
+the first frame can be loaded on a background thread with load_async().
+"""
+import hashlib, json, mmap, os, struct, threading, pygame
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from settings import (ASSET_DIR, SOUND_DIR, ASSET_CACHE_DIR, ROTATION_BUCKETS, ROTATION_CACHE_BYTES,
+                      IMAGE_CACHE_BYTES, FRAME_SCALE_STEP)
+
+_PIXELS = struct.Struct("<4s4sII")   # magic, pixel format, width, height; pixels follow
+_MAGIC = b"ISAC"
+_FONTS_FILE = "fonts.json"           # font name/style -> matched file, in ASSET_CACHE_DIR
+
+_loader = None               # background loading thread (see load_async)
 _sounds = {}
+_sounds_loading = None       # Future of a background load_sounds()
+_font_paths = None           # font name/style -> file, as remembered in the cache
+_rotations = OrderedDict()   # (name, bucket, scale) -> Surface, least recently used first
+_rotation_bytes = 0
+_images = OrderedDict()      # name -> [Surface, refcount], least recently used first
+_image_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+_scaled_frames = {}          # (id(frames), quantized scale) -> (frames, scaled frames)
+
+# name: (file in SOUND_DIR, volume)
+SOUNDS = {
+    "planet_explosion": ("planet_boom.mp3", 0.8),
+    "wilhelm":          ("wilhelm.wav", 0.3),
+    "empty":            ("empty.mp3", 0.9),
+}
+
+def load_async(fn, *args):
+    """Run fn(*args) on the background loading thread; returns its Future.
+    Only loading belongs there: the disk, decoding, and building surfaces
+    nothing on the main thread is using yet."""
+    global _loader
+    if _loader is None:
+        _loader = ThreadPoolExecutor(1, thread_name_prefix="assets")
+    return _loader.submit(fn, *args)
+
+def _cache_file(kind: str, source: str, *variant) -> str | None:
+    if ASSET_CACHE_DIR is None:
+        return None
+    st = os.stat(source)
+    key = repr((os.path.abspath(source), st.st_mtime_ns, st.st_size, variant))
+    return os.path.join(ASSET_CACHE_DIR, f"{kind}-{hashlib.sha1(key.encode()).hexdigest()[:20]}")
 
-def load_sounds():
-    # Prefer .wav or .ogg for best compatibility/latency
-    path = os.path.join("sounds", "planet_boom.mp3")  # or .wav
-    _sounds["planet_explosion"] = pygame.mixer.Sound(path)
-    _sounds["planet_explosion"].set_volume(0.8)
-    
-    path = os.path.join("sounds", "wilhelm.wav")  # or .wav
-    _sounds["wilhelm"] = pygame.mixer.Sound(path)
-    _sounds["wilhelm"].set_volume(0.3)
+def _cache_map(path: str | None):
+    """The cache file memory-mapped read-only, or None if there isn't one."""
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):     # missing, or empty (a write that never finished)
+        return None
 
-    path = os.path.join("sounds", "empty.mp3")  # or .wav
-    _sounds["empty"] = pygame.mixer.Sound(path)
-    _sounds["empty"].set_volume(0.9)
+def _cache_store(path: str | None, *chunks):
+    if path is None:
+        return
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp, path)         # readers only ever see complete files
+    except OSError:
+        pass                          # read-only install: decode every launch instead
+
+def _pixels(name: str, size=None, fmt: str = "RGBA") -> pygame.Surface:
+    """ASSET_DIR/name decoded (and scaled to `size`), not yet converted to the
+    display format. Comes straight from a memory-mapped cache file after the
+    first launch."""
+    source = os.path.join(ASSET_DIR, name)
+    path = _cache_file("img", source, size, fmt)
+    mm = _cache_map(path)
+    if mm is not None:
+        magic, f, w, h = _PIXELS.unpack_from(mm) if len(mm) >= _PIXELS.size else (None,) * 4
+        if magic == _MAGIC and f.rstrip(b"\0") == fmt.encode() and len(mm) == _PIXELS.size + w * h * len(fmt):
+            return pygame.image.frombuffer(memoryview(mm)[_PIXELS.size:], (w, h), fmt)
+    surf = pygame.image.load(source)
+    if size is not None:
+        surf = pygame.transform.scale(surf, size)
+    _cache_store(path, _PIXELS.pack(_MAGIC, fmt.encode(), *surf.get_size()),
+                 pygame.image.tobytes(surf, fmt))
+    return surf
+
+def _load_sound(file: str) -> pygame.mixer.Sound:
+    """A Sound from SOUND_DIR/file; its PCM samples (in the mixer's current
+    format) come from the cache after the first launch."""
+    source = os.path.join(SOUND_DIR, file)
+    path = _cache_file("pcm", source, pygame.mixer.get_init())
+    mm = _cache_map(path)
+    if mm is not None:
+        return pygame.mixer.Sound(buffer=mm)
+    sound = pygame.mixer.Sound(source)
+    _cache_store(path, sound.get_raw())
+    return sound
+
+def _load_sounds():
+    for name, (file, volume) in SOUNDS.items():
+        sound = _load_sound(file)
+        sound.set_volume(volume)
+        _sounds[name] = sound
+
+def load_sounds(background: bool = False):
+    """Load SOUNDS, on the loading thread if `background`; get_sound() waits
+    for a background load to finish."""
+    global _sounds_loading
+    if background:
+        _sounds_loading = load_async(_load_sounds)
+    else:
+        _load_sounds()
 
 def get_sound(name: str) -> pygame.mixer.Sound | None:
+    if _sounds_loading is not None:
+        _sounds_loading.result()
     return _sounds.get(name)
 
+def load_font(name: str, size: int, bold: bool = False) -> pygame.font.Font:
+    """pygame.font.SysFont(name, size, bold), without listing the system's
+    fonts on every launch: the file it matches is remembered in the cache."""
+    global _font_paths
+    fonts_file = ASSET_CACHE_DIR and os.path.join(ASSET_CACHE_DIR, _FONTS_FILE)
+    if _font_paths is None:
+        try:
+            with open(fonts_file) as f:
+                _font_paths = json.load(f)
+        except (TypeError, OSError, ValueError):
+            _font_paths = {}
+    key = f"{name}:{'bold' if bold else 'regular'}"
+    path = _font_paths.get(key)
+    if key not in _font_paths or (path is not None and not os.path.exists(path)):
+        path = _font_paths[key] = pygame.font.match_font(name, bold=bold)   # None: pygame's own font
+        if fonts_file:
+            _cache_store(fonts_file, json.dumps(_font_paths, indent=1).encode())
+    font = pygame.font.Font(path, size)
+    if bold and path is None:
+        font.set_bold(True)
+    return font
+
 def load_img(name: str) -> pygame.Surface:
-    return pygame.image.load(os.path.join(ASSET_DIR, name)).convert_alpha()
+    return _pixels(name).convert_alpha()
+
+def load_img_scaled(name: str, size) -> pygame.Surface:
+    """An opaque image (e.g. the background) scaled to `size`."""
+    return _pixels(name, tuple(size), "RGB").convert()
+
+def _surface_bytes(surf: pygame.Surface) -> int:
+    return surf.get_width() * surf.get_height() * surf.get_bytesize()
+
+def get_rotated(name: str, sprite: pygame.Surface, angle_deg: float, scale: float = 1.0) -> pygame.Surface:
+    """rotozoom(sprite, angle_deg, scale) with the angle quantized to
+    ROTATION_BUCKETS steps, cached per sprite name under an LRU byte cap."""
+    global _rotation_bytes
+    bucket = round(angle_deg * ROTATION_BUCKETS / 360.0) % ROTATION_BUCKETS
+    key = (name, bucket, scale)
+    img = _rotations.get(key)
+    if img is not None:
+        _rotations.move_to_end(key)
+        return img
+    img = pygame.transform.rotozoom(sprite, bucket * 360.0 / ROTATION_BUCKETS, scale)
+    _rotations[key] = img
+    _rotation_bytes += _surface_bytes(img)
+    while _rotation_bytes > ROTATION_CACHE_BYTES and len(_rotations) > 1:
+        _, old = _rotations.popitem(last=False)
+        _rotation_bytes -= _surface_bytes(old)
+    return img
+
+def prewarm_rotations(name: str, sprite: pygame.Surface, scale: float = 1.0):
+    """Fill the rotation cache with every bucket of one sprite/scale."""
+    for bucket in range(ROTATION_BUCKETS):
+        get_rotated(name, sprite, bucket * 360.0 / ROTATION_BUCKETS, scale)
+
+def acquire_img(name: str) -> pygame.Surface:
+    """Shared, decoded copy of an image; pair every call with release_img(name).
+    Only the first acquire (or one after eviction) touches the disk."""
+    entry = _images.get(name)
+    if entry is not None:
+        _image_stats["hits"] += 1
+        entry[1] += 1
+        _images.move_to_end(name)
+        return entry[0]
+    _image_stats["misses"] += 1
+    surf = load_img(name)
+    _images[name] = [surf, 1]
+    _image_stats["bytes"] += _surface_bytes(surf)
+    _evict_images()
+    return surf
+
+def release_img(name: str):
+    entry = _images.get(name)
+    if entry is None:
+        return
+    entry[1] = max(0, entry[1] - 1)
+    _evict_images()
+
+def _evict_images():
+    # only unreferenced images are evicted, oldest first, and only over budget
+    if _image_stats["bytes"] <= IMAGE_CACHE_BYTES:
+        return
+    for name in [n for n, (_, refs) in _images.items() if refs == 0]:
+        surf, _ = _images.pop(name)
+        _image_stats["bytes"] -= _surface_bytes(surf)
+        _image_stats["evictions"] += 1
+        if _image_stats["bytes"] <= IMAGE_CACHE_BYTES:
+            break
+
+def image_stats() -> dict:
+    """Registry counters: hits, misses, evictions, resident bytes and images."""
+    return dict(_image_stats, images=len(_images),
+                refs=sum(refs for _, refs in _images.values()))
+
+def get_scaled_frames(frames: list, scale: float) -> list:
+    """All frames of an animation rotozoomed to `scale` (quantized to
+    FRAME_SCALE_STEP). Built once per frame set and scale, then shared."""
+    q = max(1, round(scale / FRAME_SCALE_STEP))
+    key = (id(frames), q)
+    entry = _scaled_frames.get(key)
+    if entry is None:
+        scaled = [pygame.transform.rotozoom(f, 0, q * FRAME_SCALE_STEP) for f in frames]
+        # keep the source list alive so its id() can't be reused by another list
+        entry = _scaled_frames[key] = (frames, scaled)
+    return entry[1]
 
 def load_spritesheet(path: str, frame_width: int, frame_height: int):
-    sheet = pygame.image.load(os.path.join(ASSET_DIR, path)).convert_alpha()
+    sheet = load_img(path)
     sheet_width, _ = sheet.get_size()
     frames = []
     for x in range(0, sheet_width, frame_width):
@@ -45,7 +252,7 @@ def fade_surface(surface: pygame.Surface, factor: float) -> pygame.Surface:
 
 def load_grid_spritesheet(path: str, cols: int, rows: int):
     """Load a grid sprite sheet and return frames left->right, top->bottom."""
-    sheet = pygame.image.load(os.path.join(ASSET_DIR, path)).convert_alpha()
+    sheet = load_img(path)
     sw, sh = sheet.get_size()
     fw, fh = sw // cols, sh // rows
     frames = []
@@ -0,0 +1,233 @@
+"""Headless performance benchmarks on seeded scenarios, with a baseline check.
+
+Every scenario is a seeded match (SDL dummy video/audio, so no window) with
+extra rockets and/or orbiting bodies added at tick 0, and is measured for:
+
+    ticks_per_s   Simulation.step() throughput, no rendering (best of REPEATS)
+    frame_p50/99  ms per rendered frame (Game.update + Game.draw), best of
+                  REPEATS runs of FRAMES frames
+    preview_ms    one full aim-preview rebuild (Game.simulate_preview), best of 20
+    preview_err_px
+                  worst gap between the aim line Game.update left and a
+                  fresh rebuild, over PREVIEW_CHECK_TICKS ticks
+    fade_ms       one full-screen assets.fade_surface
+    peak_kb       peak Python/NumPy allocation while building and stepping it
+
+    python bench.py                                # run all, print a table
+    python bench.py --save bench_baseline.json     # record a baseline
+    python bench.py --baseline bench_baseline.json # compare; exit 1 on a regression
+
+A metric regresses when it is more than --tolerance (default 25%), or its
+own entry in TOLERANCE if that is looser, worse than the baseline;
+preview_err_px fails past PREVIEW_ERR_LIMIT whatever the baseline.
+
+Baselines are only comparable on the same machine, so none is kept in the
+repo (bench_baseline.json is ignored). Record one from the commit to compare
+against, on the machine that will run the check:
+
+    git stash && python bench.py --save bench_baseline.json && git stash pop
+    python bench.py --baseline bench_baseline.json
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse, json, math, random, statistics, sys, time, tracemalloc
+import pygame
+
+SIZE = (1280, 720)
+TICKS = 1200          # sim steps timed per run
+FRAMES = 300          # frames timed per run, so p99 is the 3rd-worst, not the worst
+WARMUP = 10
+REPEATS = 3           # timing runs per scenario; the best one counts
+PREVIEW_CHECK_TICKS = 60
+PREVIEW_ERR_LIMIT = 3.0   # px
+
+# name: (extra bodies, rockets, gravity backend)
+SCENARIOS = {
+    "duel":        (0,   1,   "direct"),
+    "salvo":       (0,   64,  "direct"),
+    "swarm":       (0,   512, "direct"),
+    "crowd":       (252, 64,  "direct"),
+    "crowd_bh":    (252, 256, "barnes-hut"),
+}
+
+# metrics where bigger is better; every other metric is a cost
+HIGHER_IS_BETTER = {"ticks_per_s"}
+# allowed slowdown for metrics too noisy for --tolerance (a few samples set a tail)
+TOLERANCE = {"frame_p99_ms": 0.5}
+
+def build(name, seed=0):
+    """The scenario's Simulation, ready to step."""
+    from sim import Simulation
+    from entities import Planet
+    bodies, rockets, gravity = SCENARIOS[name]
+    sim = Simulation(seed=seed, gravity=gravity)
+    rng = random.Random(seed)
+
+    # extra small bodies on their own orbits, alternating owners
+    for i in range(bodies):
+        owner = ("Blue", "Red")[i % 2]
+        p = Planet(("BlueIce.png", "RedLava.png")[i % 2], None, rng.uniform(90, 340),
+                   rng.uniform(8, 60), 6, 40.0, rng.uniform(0, math.tau), 6.0,
+                   num_sites=1, owner=owner)
+        p.id = len(sim.all_planets)
+        p.scoreboard = sim.scoreboard
+        sim.all_planets += (p,)
+        for site in p.sites:
+            site.owner = owner
+            site.id = len(sim.sites)
+            sim.sites.append(site)
+        sim.planets.append(p)
+    sim.ephemeris.set_planets(sim.planets)
+    # nothing is destroyed, so the load stays the same for the whole run
+    for p in sim.planets:
+        p.max_health = p.health = 10 ** 9
+
+    # a fan of rockets from the original planets' towers
+    sites = [s for p in sim.planets[:4] for s in p.sites]
+    for i in range(rockets):
+        site = sites[i % len(sites)]
+        player = sim.player_named[site.owner]
+        sim.spawn_rocket(player, site, rng.uniform(-0.35, 0.35), rng.uniform(150, 420))
+    sim.scoreboard.rebuild(sim.planets, sim.rockets)
+    return sim
+
+def _percentile(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(len(xs) * q))]
+
+def bench_sim(name):
+    best = 0.0
+    for _ in range(REPEATS):
+        sim = build(name)
+        for _ in range(WARMUP):
+            sim.step()
+        t0 = time.perf_counter()
+        for _ in range(TICKS):
+            sim.step()
+        best = max(best, TICKS / (time.perf_counter() - t0))
+    return best
+
+def bench_memory(name):
+    tracemalloc.start()
+    sim = build(name)
+    for _ in range(WARMUP * 3):
+        sim.step()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024
+
+def bench_render(name):
+    from game import Game
+    from assets import fade_surface
+    g = Game(sim=build(name), size=SIZE)
+    g._auto_select_site_for_current_player()
+    for _ in range(WARMUP):
+        g.update()
+        g.draw(0.5)
+    p50, p99 = [], []
+    for _ in range(REPEATS):
+        frames = []
+        for _ in range(FRAMES):
+            t0 = time.perf_counter()
+            g.update()
+            g.draw(0.5)
+            frames.append(time.perf_counter() - t0)
+        p50.append(_percentile(frames, 0.5))
+        p99.append(_percentile(frames, 0.99))
+
+    preview = []
+    for _ in range(20):
+        t0 = time.perf_counter()
+        g.simulate_preview()
+        preview.append(time.perf_counter() - t0)
+
+    # the aim line kept between updates must match one integrated from scratch
+    err = 0.0
+    for _ in range(PREVIEW_CHECK_TICKS):
+        g.update()
+        kept = g.preview_traj
+        g.simulate_preview(g.preview_steps)
+        k = min(len(kept), len(g.preview_traj))
+        for (x0, y0), (x1, y1) in zip(kept[:k], g.preview_traj[:k]):
+            err = max(err, math.hypot(x1 - x0, y1 - y0))
+
+    layer = pygame.Surface(SIZE, pygame.SRCALPHA)
+    layer.fill((255, 255, 255, 255))
+    fade = []
+    for _ in range(15):
+        t0 = time.perf_counter()
+        fade_surface(layer, 0.9)
+        fade.append(time.perf_counter() - t0)
+    return (min(p50) * 1e3, min(p99) * 1e3, min(preview) * 1e3,
+            err, statistics.median(fade) * 1e3)
+
+def run(names):
+    pygame.init()
+    results = {}
+    for name in names:
+        frame_p50, frame_p99, preview, preview_err, fade = bench_render(name)
+        results[name] = {
+            "ticks_per_s": bench_sim(name),
+            "frame_p50_ms": frame_p50,
+            "frame_p99_ms": frame_p99,
+            "preview_ms": preview,
+            "preview_err_px": preview_err,
+            "fade_ms": fade,
+            "peak_kb": bench_memory(name),
+        }
+    return results
+
+def compare(results, baseline, tolerance):
+    """[(scenario, metric, value, base, change)] for metrics worse than
+    `tolerance` (a fraction; see TOLERANCE) relative to the baseline."""
+    regressions = []
+    for name, metrics in results.items():
+        if metrics["preview_err_px"] > PREVIEW_ERR_LIMIT:
+            regressions.append((name, "preview_err_px", metrics["preview_err_px"], PREVIEW_ERR_LIMIT,
+                                metrics["preview_err_px"] / PREVIEW_ERR_LIMIT - 1))
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if not base:
+                continue
+            change = value / base - 1
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            if worse > max(tolerance, TOLERANCE.get(metric, 0.0)):
+                regressions.append((name, metric, value, base, change))
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("scenarios", nargs="*", metavar="SCENARIO",
+                    help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    ap.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    ap.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (fraction)")
+    args = ap.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    results = run(args.scenarios or list(SCENARIOS))
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'scenario':<10}" + "".join(f"{m:>16}" for m in metrics))
+    for name, row in results.items():
+        print(f"{name:<10}" + "".join(f"{row[m]:>16.2f}" for m in metrics))
+        if name in baseline:
+            deltas = [f"{row[m] / baseline[name][m] - 1:+.1%}" if baseline[name].get(m) else "-"
+                      for m in metrics]
+            print(f"{'  vs base':<10}" + "".join(f"{d:>16}" for d in deltas))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, metric, value, base, change in regressions:
+        print(f"REGRESSION {name}.{metric}: {value:.2f} vs baseline {base:.2f} ({change:+.1%})")
+    sys.exit(1 if regressions else 0)
@@ -1,8 +1,12 @@
-import math, random, pygame
+import itertools, math, random, pygame
+import numpy as np
 import settings as cfg
-from settings import (DT, PREVIEW_DT_SCALE, G, STAR_MASS, ANGLE_LIMIT_DEG, MIN_SPEED, MAX_SPEED, YELLOW, GREEN, RED, SHOTS_PER_PLANET)
+from settings import (DT, PREVIEW_DT_SCALE, ANGLE_LIMIT_DEG, MIN_SPEED, MAX_SPEED, YELLOW, GREEN, RED, SHOTS_PER_PLANET,
+                      TOWER_SPRITE, TOWER_SCALE, ROCKET_SCALE)
 
-from assets import load_img
+from assets import acquire_img, release_img, get_rotated, get_scaled_frames
+
+_rocket_ids = itertools.count()
 
 class Explosion:
     """One-shot sprite animation at a fixed position."""
@@ -11,10 +15,9 @@ class Explosion:
         self.frame_time = frame_time
         self.t = 0.0
         self.alive = True
-        # Pre-scale frames for this explosion size
-        self.frames = [
-            pygame.transform.rotozoom(f, 0, scale) for f in frames
-        ]
+        # Pre-scaled frames for this explosion size (shared, see assets.get_scaled_frames)
+        self.frames = get_scaled_frames(frames, scale)
+        self._source, self.scale = frames, scale
         self.index = 0
 
                 # Play sound immediately if provided
@@ -30,24 +33,32 @@ class Explosion:
             self.alive = False
             self.index = len(self.frames) - 1
 
-    def draw(self, surf):
+    def draw(self, surf, scale=1.0):
+        """Draw the current frame, at `scale` times world pixels; returns the
+        touched rect (or None)."""
         if not self.alive:
-            return
-        img = self.frames[self.index]
-        rect = img.get_rect(center=self.pos)
-        surf.blit(img, rect)
+            return None
+        frames = self.frames if scale == 1.0 else get_scaled_frames(self._source, self.scale * scale)
+        img = frames[self.index]
+        rect = img.get_rect(center=(int(self.pos[0] * scale), int(self.pos[1] * scale)))
+        return surf.blit(img, rect)
 
 class Planet:
     def __init__(self, name, sprite, orbit_radius, orbit_period, radius_px, mass,
                  initial_angle=0.0, spin_period=None, num_sites=1, owner=None):
         self.name = name
-        self.sprite = sprite
+        self.sprite = sprite          # None: acquired from the registry on first draw
+        self._sprite_ref = False
         self.orbit_radius = orbit_radius
         self.orbit_period = orbit_period
         self.radius_px = radius_px
         self.mass = mass
         self.theta = initial_angle
         self.spin = 0.0
+        self.pos = self._orbit_pos(self.theta)   # kept current by ephemeris.Ephemeris
+        # previous tick's angles, for render interpolation
+        self.prev_theta = self.theta
+        self.prev_spin = self.spin
         self.spin_period = spin_period if spin_period else orbit_period * 0.5
         self.owner = owner
         self.sites = []
@@ -56,37 +67,67 @@ class Planet:
         self.health = self.max_health
         # No Shots
         self.shots = SHOTS_PER_PLANET
+        self.scoreboard = None        # scoreboard.Scoreboard told about damage, if any
         for i in range(num_sites):
             site_angle = (i / num_sites) * math.tau
             self.sites.append(LaunchSite(self, site_angle))
 
-    @property
-    def pos(self):
+    def _orbit_pos(self, theta):
         cx, cy = cfg.CENTER
-        x = cx + self.orbit_radius * math.cos(self.theta)
-        y = cy + self.orbit_radius * math.sin(self.theta)
-        return (x, y)
-
-    def update(self, dt):
-        self.theta += math.tau * dt / self.orbit_period
-        self.spin  += math.tau * dt / self.spin_period
-        self.theta %= math.tau
-        self.spin  %= math.tau
+        return (cx + self.orbit_radius * math.cos(theta),
+                cy + self.orbit_radius * math.sin(theta))
+
+    def lerp_angles(self, alpha):
+        """(theta, spin) blended between the previous and current tick."""
+        dth = (self.theta - self.prev_theta + math.pi) % math.tau - math.pi
+        dsp = (self.spin - self.prev_spin + math.pi) % math.tau - math.pi
+        return self.prev_theta + dth * alpha, self.prev_spin + dsp * alpha
+
+    def lerp_pos(self, alpha):
+        return self._orbit_pos(self.lerp_angles(alpha)[0])
+
+    def acquire(self):
+        """Resolve the planet and tower sprites now instead of on first draw."""
+        if self.sprite is None:
+            self.sprite = acquire_img(self.name)
+            self._sprite_ref = True
+        for s in self.sites:
+            s.acquire()
+
+    def release(self):
+        if self._sprite_ref:
+            release_img(self.name)
+            self._sprite_ref = False
+        for s in self.sites:
+            s.release()
 
     def take_damage(self, amount):
-        self.health = max(0, min(self.max_health, self.health - amount))
-
-    def draw(self, surf):
-        x, y = self.pos
-        rect = self.sprite.get_rect(center=(x, y))
-        surf.blit(self.sprite, rect)
+        health = max(0, min(self.max_health, self.health - amount))
+        if self.scoreboard is not None:
+            self.scoreboard.add(self.owner, health=health - self.health)
+        self.health = health
+
+    def draw(self, surf, alpha=1.0, scale=1.0):
+        """Draw planet and health ring `alpha` of the way from the previous to
+        the current tick, at `scale` times world pixels; returns the touched rect."""
+        if self.sprite is None:
+            self.sprite = acquire_img(self.name)
+            self._sprite_ref = True
+        x, y = self.pos if alpha >= 1.0 else self.lerp_pos(alpha)
+        x, y = x * scale, y * scale
+        img = self.sprite if scale == 1.0 else get_rotated(self.name, self.sprite, 0.0, scale)
+        rect = img.get_rect(center=(x, y))
+        dirty = surf.blit(img, rect)
 
         # Health ring inside the planet
         ring_thickness = max(3, int(self.radius_px * 0.12))
         ring_radius = max(4, self.radius_px - ring_thickness - 2)
+        if scale != 1.0:
+            ring_thickness = max(1, int(ring_thickness * scale))
+            ring_radius = max(2, int(ring_radius * scale))
 
         # Red base ring
-        pygame.draw.circle(surf, RED, (int(x), int(y)), ring_radius, ring_thickness)
+        dirty = dirty.union(pygame.draw.circle(surf, RED, (int(x), int(y)), ring_radius, ring_thickness))
 
         # Green arc for remaining health
         if self.health > 0:
@@ -96,31 +137,50 @@ class Planet:
             bbox = pygame.Rect(0, 0, ring_radius * 2, ring_radius * 2)
             bbox.center = (int(x), int(y))
             pygame.draw.arc(surf, GREEN, bbox, start_ang, stop_ang, ring_thickness)
+        return dirty
 
 class LaunchSite:
     def __init__(self, planet, angle_on_planet):
         self.planet = planet
         self.angle_on_planet = angle_on_planet
-        self.sprite = load_img("tower2.png")
+        self.sprite = None            # acquired from the registry on first draw
         self.planned_angle_offset = 0.0
         self.planned_speed = 300.0
 
-    def get_world_pos(self):
-        px, py = self.planet.pos
-        ang = self.angle_on_planet + self.planet.spin
+    def acquire(self):
+        if self.sprite is None:
+            self.sprite = acquire_img(TOWER_SPRITE)
+
+    def release(self):
+        if self.sprite is not None:
+            release_img(TOWER_SPRITE)
+            self.sprite = None
+
+    def get_world_pos(self, alpha=1.0):
+        if alpha >= 1.0:
+            (px, py), spin = self.planet.pos, self.planet.spin
+        else:
+            px, py = self.planet.lerp_pos(alpha)
+            spin = self.planet.lerp_angles(alpha)[1]
+        ang = self.angle_on_planet + spin
         ox = math.cos(ang) * (self.planet.radius_px + 10)
         oy = math.sin(ang) * (self.planet.radius_px + 10)
         return (px + ox, py + oy), ang
 
-    def draw(self, surf, highlight=False):
-        (x, y), ang = self.get_world_pos()
+    def draw(self, surf, highlight=False, alpha=1.0, scale=1.0):
+        """Draw the tower (and aim fan if highlighted), at `scale` times world
+        pixels; returns the touched rect."""
+        if self.sprite is None:
+            self.sprite = acquire_img(TOWER_SPRITE)
+        (x, y), ang = self.get_world_pos(alpha)
+        x, y = x * scale, y * scale
         deg = math.degrees(ang) - 90
-        img = pygame.transform.rotozoom(self.sprite, -deg, 1)
+        img = get_rotated(TOWER_SPRITE, self.sprite, -deg, TOWER_SCALE * scale)
         rect = img.get_rect(center=(x, y))
-        surf.blit(img, rect)
+        dirty = surf.blit(img, rect)
         if highlight:
-            pygame.draw.circle(surf, YELLOW, (int(x), int(y)), 10, 2)
-            r = 24
+            pygame.draw.circle(surf, YELLOW, (int(x), int(y)), max(2, int(10 * scale)), 2)
+            r = 24 * scale
             base = ang - math.pi/2
             a1 = base - math.radians(ANGLE_LIMIT_DEG) + self.planned_angle_offset
             a2 = base + math.radians(ANGLE_LIMIT_DEG) + self.planned_angle_offset
@@ -128,64 +188,37 @@ class LaunchSite:
                 ex = x + math.cos(a) * r
                 ey = y + math.sin(a) * r
                 pygame.draw.line(surf, YELLOW, (x,y), (ex,ey), 1)
-            pygame.draw.circle(surf, (255,255,255), (int(x),int(y)), r, 1)
+            dirty = dirty.union(pygame.draw.circle(surf, (255,255,255), (int(x),int(y)), int(r), 1))
+        return dirty
 
 class Rocket:
     def __init__(self, owner, pos, vel):
         self.owner = owner
-        self.pos = list(pos)
-        self.vel = list(vel)
+        # rebound to rows of the RocketSwarm buffers once added (see physics.py)
+        self.pos = np.array(pos, dtype=float)
+        self.vel = np.array(vel, dtype=float)
+        self.prev_pos = self.pos.copy()   # previous tick, for render interpolation
         self.alive = True
-        sprite_name = f"{owner.name.lower()}_rocket.png"
-        self.sprite = load_img(sprite_name)
-        self.rotate_deg = 0.0
-        self.trail = []
-
-    def apply_gravity(self, planets, dt, star_mass=STAR_MASS):
-        ax, ay = 0.0, 0.0
-        # star
-        sx, sy = cfg.CENTER
-        dx, dy = sx - self.pos[0], sy - self.pos[1]
-        r2 = dx*dx + dy*dy + 1e-6
-        invr3 = 1.0 / (r2 * math.sqrt(r2))
-        a = G * star_mass
-        ax += a * dx * invr3
-        ay += a * dy * invr3
-        # planets
-        for p in planets:
-            px, py = p.pos
-            dx, dy = px - self.pos[0], py - self.pos[1]
-            r2 = dx*dx + dy*dy + 1e-6
-            invr3 = 1.0 / (r2 * math.sqrt(r2))
-            a = G * p.mass
-            ax += a * dx * invr3
-            ay += a * dy * invr3
-        self.vel[0] += ax * dt
-        self.vel[1] += ay * dt
-
-    def update(self, planets, dt):
-        self.apply_gravity(planets, dt)
-        self.pos[0] += self.vel[0] * dt
-        self.pos[1] += self.vel[1] * dt
-        self.trail.append((int(self.pos[0]), int(self.pos[1])))
-        if len(self.trail) > 800:
-            self.trail.pop(0)
-        self.rotate_deg = math.degrees(math.atan2(self.vel[1], self.vel[0])) + 90
-
-        # collisions with planets
-        for p in planets:
-            px, py = p.pos
-            if (self.pos[0]-px)**2 + (self.pos[1]-py)**2 <= (p.radius_px)**2:
-                p.take_damage(34)
-                self.alive = False
-                break
-
-    def draw(self, surf):
-        if len(self.trail) > 2:
-            try:
-                pygame.draw.aalines(surf, (255,255,255,30), False, self.trail, 1)
-            except Exception:
-                pass
-        img = pygame.transform.rotozoom(self.sprite, -self.rotate_deg, 0.9)
-        rect = img.get_rect(center=(int(self.pos[0]), int(self.pos[1])))
-        surf.blit(img, rect)
+        self.sprite_name = f"{owner.name.lower()}_rocket.png"
+        self.sprite = None            # acquired from the registry on first draw
+        self.uid = next(_rocket_ids)  # stable across snapshot copies (see worker.py)
+
+    def release(self):
+        if self.sprite is not None:
+            release_img(self.sprite_name)
+            self.sprite = None
+
+    @property
+    def rotate_deg(self):
+        return math.degrees(math.atan2(self.vel[1], self.vel[0])) + 90
+
+    def draw(self, surf, alpha=1.0, scale=1.0):
+        """Draw the rocket (its trail lives in render.TrailLayer) `alpha` of the
+        way from the previous to the current tick, at `scale` times world
+        pixels; returns the touched rect."""
+        if self.sprite is None:
+            self.sprite = acquire_img(self.sprite_name)
+        img = get_rotated(self.sprite_name, self.sprite, -self.rotate_deg, ROCKET_SCALE * scale)
+        (px, py), (x, y) = self.prev_pos, self.pos
+        rect = img.get_rect(center=(int((px + (x - px) * alpha) * scale), int((py + (y - py) * alpha) * scale)))
+        return surf.blit(img, rect)
@@ -0,0 +1,71 @@
+"""Planet orbits as contiguous arrays, evaluated once per tick.
+
+Orbits and spins are circular, so everything about a planet's motion is a
+function of its two angles. Ephemeris keeps those angles for all planets in
+arrays, advances them with one vectorised step per tick, and writes the
+results (angles and the (x, y) position) back onto the Planet objects. After
+that, nothing else needs trig to find a planet: physics reads `pos`/`gm`/
+`radius` directly, towers and drawing read `Planet.pos`, and previews ask for
+a lookahead() table of where every planet will be over the next steps.
+"""
+import math
+import numpy as np
+import settings as cfg
+from settings import G
+
+class Ephemeris:
+    def __init__(self, planets):
+        self.set_planets(planets)
+
+    def set_planets(self, planets):
+        """(Re)build the tables from the planets' current angles; call after
+        planets are added, removed or restored."""
+        self.planets = list(planets)
+        ps = self.planets
+        self.orbit_radius = np.array([p.orbit_radius for p in ps], dtype=float)
+        self.orbit_period = np.array([p.orbit_period for p in ps], dtype=float)
+        self.spin_period = np.array([p.spin_period for p in ps], dtype=float)
+        self.gm = np.array([G * p.mass for p in ps], dtype=float)
+        self.radius = np.array([p.radius_px for p in ps], dtype=float)
+        self.theta = np.array([p.theta for p in ps], dtype=float)
+        self.spin = np.array([p.spin for p in ps], dtype=float)
+        self.sync()
+
+    def _evaluate(self):
+        cx, cy = cfg.CENTER
+        self.pos = np.empty((len(self.planets), 2))
+        self.pos[:, 0] = cx + self.orbit_radius * np.cos(self.theta)
+        self.pos[:, 1] = cy + self.orbit_radius * np.sin(self.theta)
+        self._lookahead = {}
+
+    def sync(self):
+        """Recompute positions from the current angles and cfg.CENTER and write
+        them back to the planets; set_planets() ends with it, and the game
+        calls it once the screen size (and so the centre) is known."""
+        self._evaluate()
+        for p, xy in zip(self.planets, self.pos.tolist()):
+            p.pos = tuple(xy)
+
+    def advance(self, dt):
+        """Move every planet on by `dt` sim seconds."""
+        prev_theta, prev_spin = self.theta, self.spin
+        self.theta = (prev_theta + math.tau * dt / self.orbit_period) % math.tau
+        self.spin = (prev_spin + math.tau * dt / self.spin_period) % math.tau
+        self._evaluate()
+        for p, pt, ps, th, sp, xy in zip(self.planets, prev_theta.tolist(), prev_spin.tolist(),
+                                         self.theta.tolist(), self.spin.tolist(), self.pos.tolist()):
+            p.prev_theta, p.prev_spin, p.theta, p.spin = pt, ps, th, sp
+            p.pos = tuple(xy)
+
+    def lookahead(self, steps, dt):
+        """(x, y) arrays of shape (steps, planets): row k is every planet's
+        position k + 1 steps of `dt` from now. Cached until the next tick."""
+        key = (steps, dt)
+        table = self._lookahead.get(key)
+        if table is None:
+            cx, cy = cfg.CENTER
+            k = np.arange(1, steps + 1)[:, None]
+            theta = self.theta + k * (math.tau * dt / self.orbit_period)
+            table = self._lookahead[key] = (cx + self.orbit_radius * np.cos(theta),
+                                            cy + self.orbit_radius * np.sin(theta))
+        return table
@@ -1,142 +1,167 @@
-import math, random, pygame
+import math, time, pygame
+import numpy as np
 import settings as cfg 
-from settings import set_screen_metrics, DT, DEFAULT_TIME_SCALE, ACTION_TIME_SCALE, WHITE
-from assets import load_img, load_spritesheet, fade_surface, load_grid_spritesheet
-from entities import Planet, LaunchSite, Rocket, Explosion
+from settings import (set_screen_metrics, DT, WHITE, PREVIEW_DT_SCALE, G, STAR_MASS, STAR_COLLISION_RADIUS,
+                      PREVIEW_STEPS, PREVIEW_REBUILD_TIME, AI_FRAME_BUDGET, AI_LEAD,
+                      PROFILE_TRACE_FILE, TRAIL_FADE_STEP, QUALITY_GOVERNOR, QUALITY_RENDER_SCALE,
+                      QUALITY_TRAIL_FADE, QUALITY_SUN_STRIDE, QUALITY_PREVIEW_SCALE)
+from assets import (load_img_scaled, load_font, acquire_img, load_spritesheet, load_grid_spritesheet,
+                    prewarm_rotations, get_scaled_frames, load_async)
+from entities import Explosion
+from render import SunCompositor, StaticLayer, TextCache, DirtyRects, Upscaler, TrailLayer, ProfileOverlay
+from sim import Simulation
+from worker import SimWorker
+from preview import FanPreview
+from gravity import PointField
+from physics import _first_contacts
+from scheduler import Scheduler
+from ai import SearchAI
+from profiler import profiler
+from quality import QualityGovernor, STEPS
 import assets
 
-class Player:
-    def __init__(self, name, color):
-        self.name = name
-        self.color = color
-        self.alive = True
-
 class Game:
-    def __init__(self):
+    """Renderer and input layer over a sim.Simulation.
+
+    With threaded=True the simulation is stepped by a worker.SimWorker and the
+    game draws the worker's latest WorldSnapshot; inputs are sent to it as
+    commands instead of mutating the simulation directly. Players named in
+    `ai` are played by an ai.SearchAI instead of the keyboard. With quality=True
+    a quality.QualityGovernor lowers (and later restores) rendering quality
+    while frames run over budget.
+    """
+    def __init__(self, sim=None, size=None, replay=None, threaded=False, ai=(),
+                 quality=QUALITY_GOVERNOR):
         pygame.display.set_caption("I.S.A.C. — InterStellar Artillery Commander")
-        info = pygame.display.Info()
-        set_screen_metrics(info.current_w, info.current_h)
+        if size is None:
+            info = pygame.display.Info()
+            size = (info.current_w, info.current_h)
+        set_screen_metrics(*size)
 
         self.screen = pygame.display.set_mode((cfg.WIDTH, cfg.HEIGHT))
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont("consolas", 18)
-
-        # Load Sounds
-        assets.load_sounds()                      # <-- load sounds once
+        self.fps_cap = cfg.RENDER_FPS_CAP
+        if self.fps_cap is None:
+            rates = getattr(pygame.display, "get_desktop_refresh_rates", lambda: [])()
+            self.fps_cap = rates[0] if rates and rates[0] > 0 else 60
+        self.font = load_font("consolas", 18)
+
+        # Load Sounds (in the background: nothing plays before the first shot)
+        assets.load_sounds(background=True)
         pygame.mixer.set_num_channels(16)    
 
         # assets
-        self.bg = load_img("background.jpg")
-        self.bg = pygame.transform.scale(self.bg, (cfg.WIDTH, cfg.HEIGHT))
+        self.bg = load_img_scaled("background.jpg", (cfg.WIDTH, cfg.HEIGHT))
+
+        # layered rendering: static bg+orbits, cached HUD text, dirty-rect updates.
+        # The world is drawn into self.world at render_scale (straight onto the
+        # screen at 1.0) and the HUD onto the screen, tracked by self.hud.
+        self.render_scale = 1.0
+        self.world = self.screen
+        self.upscaler = None
+        self.static = StaticLayer(self.bg)
+        self.dirty = DirtyRects(self.screen)
+        self.hud = self.dirty
+        self.text = TextCache(self.font)
+        self.trails = TrailLayer((cfg.WIDTH, cfg.HEIGHT))
+        self._panel = pygame.Surface((260, 170), pygame.SRCALPHA)
+        self._panel_lines = None
+        self._finish_fonts = None
+        self.profile_overlay = ProfileOverlay(self.font)   # P; the profiler runs while it is shown
+        self.show_profile = False
 
         self.sunone_frames = load_spritesheet("s1ss.png", 80, 80)
         self.suntwo_frames = load_spritesheet("suntwo.png", 80, 80)
         self.sunone_index = 0
         self.suntwo_index = 0
-
-        # + LOAD PLANET EXPLOSION SHEET (5x10 grid -> 50 frames)
-        self.planet_explosion_frames = load_grid_spritesheet(
-            "planet_explosion.png", cols=5, rows=10
-        )
-
-        # players & turn
-        self.players = [Player("Blue", (120,200,255)), Player("Red", (255,120,120))]
-        self.turn_index = 0
-
-        # planets
-        self.planets = self.create_planets()
-        owners = [self.players[0], self.players[1]]
-        for pi, p in enumerate(self.planets):
-            for si, site in enumerate(p.sites):
-                site.owner = p.owner
-
-        # state
-        self.rockets = []
-        self.queued_shots = []  # (player, site, angle_offset, speed, fire_time_abs)
+        self._sun_ticks = 0           # ticks the sun animation is behind (see sun_stride)
+        self.sun = SunCompositor(self.sunone_frames, self.suntwo_frames,
+                                 fade_a=0.2, fade_b=0.4, scale_b=0.8)
+
+        # world state lives in the headless simulation core; in replay mode it is
+        # driven by a replay.ReplayPlayer instead of the keyboard
+        self.replay = replay
+        self.sim = sim or Simulation()
+        self.sim.ephemeris.sync()   # planets may have been placed before the screen size was known
+        self.worker = SimWorker(self.sim) if threaded and not replay else None
+        self.view = self.worker.front if self.worker else self.sim   # what draw() reads
+        self._pending_aims = {}   # site id -> (input seq, angle, speed) not yet in a snapshot
+
+        # rotated tower/rocket sprites: draw becomes a cache lookup + blit.
+        # The game holds a registry reference so they are never reloaded mid-match.
+        self.pinned_sprites = {}
+        for name in [cfg.TOWER_SPRITE] + [f"{pl.name.lower()}_rocket.png" for pl in self.players]:
+            scale = cfg.TOWER_SCALE if name == cfg.TOWER_SPRITE else cfg.ROCKET_SCALE
+            self.pinned_sprites[name] = acquire_img(name)
+            prewarm_rotations(name, self.pinned_sprites[name], scale)
+        if self.worker:
+            # snapshot copies share the live entities' sprites: resolve them on
+            # this thread before the worker starts copying
+            for p in self.sim.planets:
+                p.acquire()
+
+        # planet explosions aren't needed until a planet dies: load the sheet and
+        # pre-build each planet's explosion in the background
+        self._explosion_frames = load_async(self._load_explosions, list(self.planets))
+
+        # input / view state
         self.selected_site = None
         self.preview_traj = []
+        self.preview_dirty = True     # aim, site or planets changed since the fan was built
+        self._preview_age = 0.0       # sim time since the fan was built
+        self.fan = FanPreview()       # aim-assist fan over the whole aim envelope (F)
+        self.show_fan = False
         self.running = True
-        self.t_sim = 0.0
-        self.time_scale = DEFAULT_TIME_SCALE
 
-        # + EFFECTS (explosions, etc.)
-        self.effects = []
+        # computer players: one search at a time, run a slice per frame
+        self.ai = {name: SearchAI() for name in ai}
+        self._ai_turn = None          # turn index the search below belongs to
+        self._ai_search = None        # running SearchAI.think() generator
+        self._ai_plan = None          # (site, angle, speed); False once fired or nothing to fire
+        self._ai_fire_at = 0.0        # sim time the plan was searched for
 
-        # winner tracking
-        self.game_over = False
-        self.winner = None   # Player instance or None on tie
-
-    def _scores(self):
-        blue = sum(p.health for p in self.planets if p.owner == "Blue")
-        red  = sum(p.health for p in self.planets if p.owner == "Red")
-        return blue, red
-
-    def _shots_left(self):
-        blue = sum(p.shots for p in self.planets if p.owner == "Blue")
-        red  = sum(p.shots for p in self.planets if p.owner == "Red")
-        return blue, red
-    
-    def _check_game_over(self):
-        # --- planet wipeout first ---
-        blue_gone = not any(p.owner == "Blue" for p in self.planets)
-        red_gone  = not any(p.owner == "Red"  for p in self.planets)
-
-        if blue_gone and red_gone:
-            self.winner = None  # total annihilation -> draw
-            self.game_over = True
-            return
-        if blue_gone:
-            self.winner = next(pl for pl in self.players if pl.name == "Red")
-            self.game_over = True
-            return
-        if red_gone:
-            self.winner = next(pl for pl in self.players if pl.name == "Blue")
-            self.game_over = True
-            return
-
-        # --- otherwise, only end when neither side can shoot and nothing is pending ---
-        blue_shots, red_shots = self._shots_left()
-        rockets_alive = any(r.alive for r in self.rockets)
-        nothing_pending = (not rockets_alive) and (len(self.queued_shots) == 0)
-
-        if blue_shots == 0 and red_shots == 0 and nothing_pending:
-            blue_score, red_score = self._scores()
-            if blue_score > red_score:
-                self.winner = next(pl for pl in self.players if pl.name == "Blue")
-            elif red_score > blue_score:
-                self.winner = next(pl for pl in self.players if pl.name == "Red")
-            else:
-                self.winner = None  # tie
-            self.game_over = True
-
-    def create_planets(self):
-        sprites = [
-        ("BlueIce.png", 50, 0.8, "Blue"),       
-        ("RedLava.png", 60, 0.7, "Red"),
-        ("BlueGas.png", 70, 1.0, "Blue"),
-        ("RedGas.png", 80, 0.9, "Red"),
-        #("RedVoid.png", 64, 0.8),
-        ]
-        planets = []
-        for i, (name, px_size, mass_scale, owner) in enumerate(sprites):
-            sprite = load_img(name)
-            orbit_radius = 100 + i*80 + (random.random() * 50 - 25)
-            orbit_period = 3 + (random.random() * 50) + (i * 5)
-            radius_px = px_size//2
-            mass = 1200 * mass_scale
-            initial_angle = i * (math.tau/len(sprites))
-            spin_period = 6+(random.random()*4-2)
-            num_sites = random.choice([1,2])
-            p = Planet(name, sprite, orbit_radius * 1.0, orbit_period, radius_px, mass,
-                       initial_angle, spin_period, num_sites=num_sites, owner=owner)
-            planets.append(p)
-        return planets
+        # + EFFECTS (explosions, etc.), removed when their "expire" timer comes due
+        self.effects = []
+        self.timers = Scheduler()
+        self._view_time = 0.0         # sim seconds seen by this view
+
+        # quality governor: started by run(), once the match is fully set up
+        self.quality = quality
+        self.governor = None
+        self.preview_steps = PREVIEW_STEPS
+        self.sun_stride = 1
+
+    # read-only views of the simulation, so drawing code reads naturally
+    planets           = property(lambda self: self.view.planets)
+    rockets           = property(lambda self: self.view.rockets)
+    queued_shot_count = property(lambda self: self.view.queued_shot_count)
+    players           = property(lambda self: self.view.players)
+    game_over         = property(lambda self: self.view.game_over)
+    winner            = property(lambda self: self.view.winner)
+
+    @property
+    def planet_explosion_frames(self):
+        return self._explosion_frames.result()    # waits if it is still loading
+
+    def _load_explosions(self, planets):
+        # + LOAD PLANET EXPLOSION SHEET (5x10 grid -> 50 frames)
+        frames = load_grid_spritesheet("planet_explosion.png", cols=5, rows=10)
+        # pre-build each planet's explosion so its death doesn't hitch
+        for p in planets:
+            get_scaled_frames(frames, self._explosion_scale(p, frames))
+        return frames
+
+    def _explosion_scale(self, planet, frames):
+        # scale explosion roughly to planet size (diameter/texture size heuristic)
+        # Base the scale so the explosion is a bit larger than the planet
+        base_frame = frames[0]
+        bw, bh = base_frame.get_size()
+        target_diam = int(planet.radius_px * 3)  # a touch bigger than planet
+        # keep aspect based on width
+        return max(0.1, target_diam / max(1, bw))
 
     def current_player(self):
-        return self.players[self.turn_index % len(self.players)]
-
-    def cycle_turn(self):
-        self.turn_index = (self.turn_index + 1) % len(self.players)
+        return self.view.current_player()
 
     def select_site_by_click(self, mx, my):
         my_planets = [p for p in self.planets if p.owner ==  self.current_player().name]
@@ -152,7 +177,7 @@ class Game:
                     best_d2 = d2
         if best:
             self.selected_site = best
-            self.update_preview()
+            self.invalidate_preview()
 
     def plan_adjust(self, dx_angle=0.0, dspeed=0.0, ddelay=0.0):
         from settings import ANGLE_LIMIT_DEG, MIN_SPEED, MAX_SPEED
@@ -162,107 +187,154 @@ class Game:
         limit = math.radians(ANGLE_LIMIT_DEG)
         s.planned_angle_offset = max(-limit, min(limit, s.planned_angle_offset))
         s.planned_speed = max(MIN_SPEED, min(MAX_SPEED, s.planned_speed + dspeed))
+        if self.worker:
+            seq = self.worker.submit("aim", s.id, s.planned_angle_offset, s.planned_speed)
+            self._pending_aims[s.id] = (seq, s.planned_angle_offset, s.planned_speed)
         
-        self.update_preview()
+        self.invalidate_preview()
 
     def queue_shot(self):
-        if not self.selected_site: return
+        if not self.selected_site or self.replay: return
 
         # If you have now 
-        if self.selected_site.planet.shots < 1: 
+        site = self.selected_site
+        if site.planet.shots < 1 or (not self.worker and not self.sim.queue_shot(site)):
             empty_sound = assets.get_sound("empty")
             empty_sound.play()
             return
-        
-        now = self.t_sim
-        fire_time = now
-        self.queued_shots.append((
-            self.current_player(), self.selected_site,
-            self.selected_site.planned_angle_offset,
-            self.selected_site.planned_speed, fire_time
-        ))
-        self.cycle_turn()
+        if self.worker:
+            # the worker passes the turn on its next tick; select for the player after
+            self.worker.submit("shot", site.id, site.planned_angle_offset, site.planned_speed)
+            next_player = self.players[(self.view.turn_index + 1) % len(self.players)]
+        else:
+            next_player = self.current_player()
+
         # auto-select a site owned by next player
         for p in self.planets:
             for s in p.sites:
                 # s.owner is stored as a string ("Blue"/"Red"),
                 # so compare against the current player's name
-                if s.owner == self.current_player().name:
+                if s.owner == next_player.name:
                     self.selected_site = s
-                    self.update_preview()
+                    self.invalidate_preview()
                     return
         self.selected_site = None
 
-    def spawn_rocket(self, player, site, angle_offset, speed):
-        (x,y), tower_ang = site.get_world_pos()
-        base = tower_ang - math.pi/2
-        direction = base + angle_offset
-        vx = math.cos(direction) * speed
-        vy = math.sin(direction) * speed
-        self.rockets.append(Rocket(player, (x,y), (vx,vy)))
-
-    def simulate_preview(self, steps=80):
-        import settings as cfg
-        from settings import DT, PREVIEW_DT_SCALE, G, STAR_MASS
-        if not self.selected_site:
-            self.preview_traj = []
+    def update_ai(self):
+        """If a computer player has the turn, let it search for up to
+        AI_FRAME_BUDGET seconds, then fire once its shot's time comes."""
+        view = self.view
+        if self.replay or view.game_over:
             return
-
-        clones = []
-        for p in self.planets:
-            clones.append({"theta": p.theta, "spin": p.spin, "p": p})
-
+        if view.turn_index != self._ai_turn:
+            self._ai_turn, self._ai_search, self._ai_plan = view.turn_index, None, None
+        player = view.current_player()
+        ai = self.ai.get(player.name)
+        if ai is None:
+            return
+        if self._ai_search is None and self._ai_plan is None:
+            self._ai_search = ai.think(view, player, AI_LEAD)
+            self._ai_fire_at = view.t_sim + AI_LEAD
+        if self._ai_search is not None:
+            end = time.perf_counter() + AI_FRAME_BUDGET
+            try:
+                while time.perf_counter() < end:
+                    next(self._ai_search)
+            except StopIteration as done:
+                self._ai_search = None
+                self._ai_plan = done.value or False
+        if self._ai_plan and view.t_sim >= self._ai_fire_at:
+            planned, ang, spd = self._ai_plan
+            site = next((s for p in view.planets for s in p.sites if s.id == planned.id), None)
+            if site is None:
+                self._ai_plan = None      # its planet is gone: think again
+                return
+            self._ai_plan = False
+            self.selected_site = site
+            site.planned_angle_offset, site.planned_speed = ang, spd
+            self.queue_shot()
+
+    def _launch_frame(self):
+        """Launch point and direction of the selected site's planned shot."""
         (x, y), tower_ang = self.selected_site.get_world_pos()
-        base = tower_ang - math.pi / 2
-        direction = base + self.selected_site.planned_angle_offset
-        vx = math.cos(direction) * self.selected_site.planned_speed
-        vy = math.sin(direction) * self.selected_site.planned_speed
-        rx, ry = x, y
-        rvx, rvy = vx, vy
-        traj = [(int(rx), int(ry))]
+        direction = tower_ang - math.pi / 2 + self.selected_site.planned_angle_offset
+        return x, y, direction
+
+    def _integrate_preview(self, rx, ry, rvx, rvy, steps):
+        """Integrate the preview rocket for `steps` steps against the planets'
+        lookahead positions, with the match's integrator (one path is cheap
+        even when it substeps; only the fan keeps a fixed-step kernel).
+        Returns one (x, y, vx, vy) state per step; stops early off-screen, or
+        at the first body (star or planet) the path touches, swept as in
+        RocketSwarm."""
         dt = DT * PREVIEW_DT_SCALE
-
-        for _ in range(steps):
-            # advance planets (local)
-            for c in clones:
-                p = c["p"]
-                c["theta"] += math.tau * dt / p.orbit_period
-                c["spin"]  += math.tau * dt / p.spin_period
-
-            # gravity
-            ax, ay = 0.0, 0.0
-            sx, sy = cfg.CENTER
-            dx, dy = sx - rx, sy - ry
-            r2 = dx * dx + dy * dy + 1e-6
-            invr3 = 1.0 / (r2 * math.sqrt(r2))
-            a = G * STAR_MASS
-            ax += a * dx * invr3
-            ay += a * dy * invr3
-            for c in clones:
-                p = c["p"]
-                px = cfg.CENTER[0] + p.orbit_radius * math.cos(c["theta"])
-                py = cfg.CENTER[1] + p.orbit_radius * math.sin(c["theta"])
-                dx, dy = px - rx, py - ry
-                r2 = dx * dx + dy * dy + 1e-6
-                invr3 = 1.0 / (r2 * math.sqrt(r2))
-                ax += G * p.mass * dx * invr3
-                ay += G * p.mass * dy * invr3
-
-            rvx += ax * dt
-            rvy += ay * dt
-            rx  += rvx * dt
-            ry  += rvy * dt
-            traj.append((int(rx), int(ry)))
+        ephem = self.view.ephemeris
+        step1 = self.view.integrator.step1
+        xs, ys = ephem.lookahead(steps, dt)
+        gms = ephem.gm.tolist()
+        star = (*cfg.CENTER, G * STAR_MASS)
+        states = [(rx, ry, rvx, rvy)]
+        for bxs, bys in zip(xs.tolist(), ys.tolist()):
+            # planets advanced k preview steps, from the ephemeris table
+            field = PointField([star, *zip(bxs, bys, gms)])
+            rx, ry, rvx, rvy = step1(rx, ry, rvx, rvy, field, dt)
+            states.append((rx, ry, rvx, rvy))
 
             if rx < -200 or rx > cfg.WIDTH + 200 or ry < -200 or ry > cfg.HEIGHT + 200:
                 break
 
-        self.preview_traj = traj
+        # collisions, all steps at once: step k's segment against the star and
+        # the planets where they are after it
+        k, m = len(states) - 1, len(gms) + 1
+        if k == 0:
+            return []
+        pts = np.array(states)[:, :2]
+        seg = pts[1:] - pts[:-1]
+        centers = np.empty((k, m, 2))
+        centers[:, 0] = cfg.CENTER
+        centers[:, 1:, 0] = xs[:k]
+        centers[:, 1:, 1] = ys[:k]
+        radii = np.tile(np.concatenate(([float(STAR_COLLISION_RADIUS)], ephem.radius)), k)
+        hit, _, t = _first_contacts(pts[:-1], seg, centers.reshape(-1, 2), radii,
+                                    np.repeat(np.arange(k), m), np.arange(k * m))
+        if len(hit):
+            j, t = int(hit[0]), float(t[0])       # the earliest step with a hit
+            x, y = (pts[j] + seg[j] * t).tolist()
+            states[j + 1] = (x, y) + states[j + 1][2:]
+            del states[j + 2:]
+        return states[1:]
+
+    def simulate_preview(self, steps=PREVIEW_STEPS):
+        """Integrate the aim line from the current launch frame."""
+        if not self.selected_site:
+            self.preview_traj = []
+            return
+
+        x, y, direction = self._launch_frame()
+        speed = self.selected_site.planned_speed
+        states = self._integrate_preview(x, y, math.cos(direction) * speed,
+                                         math.sin(direction) * speed, steps)
+        self.preview_traj = [(int(x), int(y))] + [(int(s[0]), int(s[1])) for s in states]
 
+    def invalidate_preview(self):
+        """Force a fan rebuild on the next update (aim/site/planets changed)."""
+        self.preview_dirty = True
 
     def update_preview(self):
-        # return
-        self.simulate_preview()
+        if not self.selected_site:
+            self.preview_traj = []
+            return
+        # the aim line is integrated over its whole horizon every tick: carrying a
+        # cached path along with the tower drifts ~100 px per sim second as the
+        # planets move on. The fan is only carried along between rebuilds.
+        self.simulate_preview(self.preview_steps)
+        if self.show_fan:
+            if self.preview_dirty or self.fan.paths is None or self._preview_age >= PREVIEW_REBUILD_TIME:
+                self.fan.build(self.selected_site, self.view.ephemeris)
+                self._preview_age = 0.0
+                self.preview_dirty = False
+            else:
+                self.fan.follow(self.selected_site)
 
     def _auto_select_site_for_current_player(self):
         self.selected_site = None
@@ -270,89 +342,145 @@ class Game:
             for s in p.sites:
                 if s.owner == self.current_player().name and s.planet.shots > 0:
                     self.selected_site = s
-                    self.update_preview()
+                    self.invalidate_preview()
                     return
-        self.update_preview()
+        self.invalidate_preview()
+
+    def set_sim(self, sim):
+        """Swap in another Simulation (replay seek) and reset view-only state."""
+        self.sim = self.view = sim
+        self.selected_site = None
+        self.preview_traj = []
+        self.effects = []
+        self.timers.clear()
+        self.trails = TrailLayer(self.world.get_size(), self.render_scale)
+        self.trails.fade_step = self._trail_fade_step()
+        self.invalidate_preview()
+        self.static.invalidate()
+
+    def _trail_fade_step(self):
+        if self.governor and self.governor.active("trails"):
+            return TRAIL_FADE_STEP * QUALITY_TRAIL_FADE
+        return TRAIL_FADE_STEP
+
+    def set_render_scale(self, scale):
+        """Draw the world at `scale` times the screen's resolution, into an
+        offscreen surface that render.Upscaler stretches onto the screen
+        (1.0: straight onto the screen). World coordinates and the HUD are
+        unaffected; trails drawn so far are redrawn from the rockets' trail
+        buffers."""
+        self.render_scale = scale
+        if scale == 1.0:
+            self.upscaler, self.world = None, self.screen
+        else:
+            self.upscaler = Upscaler(self.screen, scale)
+            self.world = self.upscaler.surface
+        size = self.world.get_size()
+        self.bg = load_img_scaled("background.jpg", size)
+        self.static = StaticLayer(self.bg, scale)
+        self.dirty = DirtyRects(self.world)
+        self.hud = self.upscaler or self.dirty
+        self.trails = TrailLayer(size, scale)
+        self.trails.fade_step = self._trail_fade_step()
+
+    def apply_quality(self):
+        """Bring view settings in line with the governor's current level."""
+        active = self.governor.active
+        scale = QUALITY_RENDER_SCALE if active("resolution") else 1.0
+        if scale != self.render_scale:
+            self.set_render_scale(scale)
+        self.trails.fade_step = self._trail_fade_step()
+        self.sun_stride = QUALITY_SUN_STRIDE if active("sun") else 1
+        steps = int(PREVIEW_STEPS * QUALITY_PREVIEW_SCALE) if active("preview") else PREVIEW_STEPS
+        if steps != self.preview_steps:
+            self.preview_steps = self.fan.steps = steps
+            self.fan.paths = None
+            self.invalidate_preview()
+
+    def _govern(self, seconds):
+        """Report one frame's work time to the governor, if there is one."""
+        if self.governor and self.governor.frame(seconds):
+            self.apply_quality()
+
+    def seek_replay(self, dticks):
+        target = max(0, self.sim.tick + dticks)
+        self.set_sim(self.replay.seek(target))
 
     def update(self):
-        self.time_scale = ACTION_TIME_SCALE if any(r.alive for r in self.rockets) else DEFAULT_TIME_SCALE
-        dt = DT * self.time_scale
-        self.t_sim += dt
-
-        # --- auto-skip if current player cannot shoot ---
-        if not self.game_over:
-            cp = self.current_player().name
-            opp = "Red" if cp == "Blue" else "Blue"
-            cp_shots  = sum(p.shots for p in self.planets if p.owner == cp)
-            opp_shots = sum(p.shots for p in self.planets if p.owner == opp)
-            nothing_pending = (not any(r.alive for r in self.rockets)) and (len(self.queued_shots) == 0)
-            if cp_shots == 0 and opp_shots > 0 and nothing_pending:
-                self.cycle_turn()
+        if self.replay:
+            self.replay.apply_inputs(self.sim)
+        dt = self.sim.step()
+        self._advance_view(self.sim.drain_events(), dt, 1)
+
+    def _sync_worker(self):
+        """Threaded mode: adopt the worker's newest snapshot, if there is one,
+        and catch the view state up with the ticks it covers. Returns it."""
+        snap = self.worker.front
+        prev = self.view
+        if snap is prev:
+            return snap
+        self.view = snap
+        for r in snap.rockets:
+            if r.sprite is None:
+                r.sprite = self.pinned_sprites[r.sprite_name]
+        # aim changes the worker hasn't applied yet stay visible
+        for sid, (seq, ang, spd) in list(self._pending_aims.items()):
+            if seq <= snap.input_seq:
+                del self._pending_aims[sid]
+            elif sid in snap.sites:
+                snap.sites[sid].planned_angle_offset, snap.sites[sid].planned_speed = ang, spd
+        if self.selected_site:
+            self.selected_site = snap.sites.get(self.selected_site.id)
+        self._advance_view(self.worker.drain_events(snap.tick), snap.t_sim - prev.t_sim, snap.tick - prev.tick)
+        return snap
+
+    def _advance_view(self, events, dt, ticks):
+        """React to sim events and advance view-only animation by `ticks` ticks
+        (`dt` sim seconds)."""
+        for ev in events:
+            if ev[0] == "rocket_dead":
+                ev[1].release()
+            elif ev[0] == "shot_rejected":
+                assets.get_sound("empty").play()
+            elif ev[0] == "turn_skipped":
                 self._auto_select_site_for_current_player()
-
-        # animate stars
-        self.sunone_index = (self.sunone_index + 1) % len(self.sunone_frames)
-        self.suntwo_index = (self.suntwo_index + 1) % len(self.suntwo_frames)
-
-        # planets move
-        for p in self.planets:
-            p.update(dt)
-
-        # fire queued (only if site/planet still exists)
-        to_fire = [q for q in self.queued_shots if q[4] <= self.t_sim]
-        self.queued_shots = [q for q in self.queued_shots if q[4] > self.t_sim]
-        for player, site, ang_off, speed, _ in to_fire:
-            if site.planet in self.planets:
-                if site.planet.shots > 0:
-                    site.planet.shots -= 1
-                    self.spawn_rocket(player, site, ang_off, speed)
-
-        # rockets
-        for r in self.rockets:
-            if r.alive:
-                r.update(self.planets, dt)
-        self.rockets = [r for r in self.rockets if r.alive]
-
-        # --- handle destroyed planets: spawn explosion; remove planet from game ---
-        removed = []
-        for p in self.planets:
-            if p.health <= 0:
-                # capture current position
-                x, y = p.pos
-                # scale explosion roughly to planet size (diameter/texture size heuristic)
-                # Base the scale so the explosion is a bit larger than the planet
-                base_frame = self.planet_explosion_frames[0]
-                bw, bh = base_frame.get_size()
-                target_diam = int(p.radius_px * 3)  # a touch bigger than planet
-                # keep aspect based on width
-                scale = max(0.1, target_diam / max(1, bw))
-
+            elif ev[0] == "planet_destroyed":
+                _, p, (x, y) = ev
+                # spawn explosion where the planet was; drop its view state
                 boom = assets.get_sound("planet_explosion")  # <-- get the sound
-                
-                self.effects.append(
-                    Explosion(self.planet_explosion_frames, (x, y), frame_time=0.015, scale=scale, sound=boom)
-                )
-                removed.append(p)
-
-        if removed:
-            removed_set = set(removed)
-            # prune planets
-            self.planets = [p for p in self.planets if p not in removed_set]
-            # clear selection & queue that reference removed planets
-            if self.selected_site and self.selected_site.planet in removed_set:
-                self.selected_site = None
-                self.preview_traj = []
-            self.queued_shots = [q for q in self.queued_shots if q[1].planet not in removed_set]
+                frames = self.planet_explosion_frames
+                fx = Explosion(frames, (x, y), frame_time=0.015,
+                               scale=self._explosion_scale(p, frames), sound=boom)
+                self.effects.append(fx)
+                self.timers.schedule(self._view_time + len(fx.frames) * fx.frame_time, "expire", fx)
+                p.release()
+                self.invalidate_preview()
+                self.static.invalidate()
+                # clear selection that references the removed planet
+                if self.selected_site and self.selected_site.planet.id == p.id:
+                    self.selected_site = None
+                    self.preview_traj = []
+
+        self.trails.advance(ticks)
+
+        # animate stars, every sun_stride-th tick
+        self._sun_ticks += ticks
+        if self._sun_ticks >= self.sun_stride:
+            self.sunone_index = (self.sunone_index + self._sun_ticks) % len(self.sunone_frames)
+            self.suntwo_index = (self.suntwo_index + self._sun_ticks) % len(self.suntwo_frames)
+            self._sun_ticks = 0
 
         # effects
+        self._view_time += dt
         for fx in self.effects:
             fx.update(dt)
-        self.effects = [fx for fx in self.effects if fx.alive]
-
-        # remove
-        self.update_preview()
+        for ev in self.timers.pop_due(self._view_time):
+            self.effects.remove(ev.payload)
 
-        self._check_game_over()
+        # preview: aim line every tick, fan rebuilt when dirty (else shifted along)
+        self._preview_age += dt
+        with profiler.scope("preview"):
+            self.update_preview()
 
     def draw_finish_screen(self):
         # Background tint in winner color (or gray if tie)
@@ -364,16 +492,16 @@ class Game:
             title = f"{self.winner.name} WINS douglas was here !"
 
         # Fullscreen color fill
-        overlay = pygame.Surface((cfg.WIDTH, cfg.HEIGHT))
-        overlay.fill(color)
-        self.screen.blit(overlay, (0, 0))
+        self.screen.fill(color)
 
-        # Big centered text
-        big_font  = pygame.font.SysFont("consolas", 72, bold=True)
-        mid_font  = pygame.font.SysFont("consolas", 32)
-        small_font = pygame.font.SysFont("consolas", 20)
+        # Big centered text (fonts looked up once)
+        if self._finish_fonts is None:
+            self._finish_fonts = (load_font("consolas", 72, bold=True),
+                                  load_font("consolas", 32),
+                                  load_font("consolas", 20))
+        big_font, mid_font, small_font = self._finish_fonts
 
-        blue_score, red_score = self._scores()
+        blue_score, red_score = self.view._scores()
         subtitle = f"Blue: {blue_score}   |   Red: {red_score}"
         hint = "Press ESC to quit"
 
@@ -389,11 +517,13 @@ class Game:
         self.screen.blit(title_surf, title_rect)
         self.screen.blit(sub_surf, sub_rect)
         self.screen.blit(hint_surf, hint_rect)
+        self.hud.force_full()
 
 
     def draw_ui(self):
         from settings import WHITE, YELLOW, ANGLE_LIMIT_DEG
-        pygame.draw.rect(self.screen, (0,0,0,60), (0,0,cfg.WIDTH,40))
+        add = self.hud.add
+        add(pygame.draw.rect(self.screen, (0,0,0,60), (0,0,cfg.WIDTH,40)))
         
         # Draw score panels
         panelH = 40
@@ -402,8 +532,8 @@ class Game:
         boxLeft = (padding,cfg.HEIGHT - panelH - padding,panelW,panelH)
         boxRight = (cfg.WIDTH - padding - panelW,cfg.HEIGHT - panelH - padding,panelW,panelH)
     
-        pygame.draw.rect(self.screen,(255,10,10,255), boxLeft)
-        pygame.draw.rect(self.screen,(10,10,255,255), boxRight)
+        add(pygame.draw.rect(self.screen,(255,10,10,255), boxLeft))
+        add(pygame.draw.rect(self.screen,(10,10,255,255), boxRight))
 
         # Highlight whoevers turn it is
         if self.current_player().name == "Blue":            
@@ -412,12 +542,11 @@ class Game:
             pygame.draw.rect(self.screen, (255, 255, 255), boxLeft, width=4)
         
         # Update scores
-        blueScore = sum(p.health for p in self.planets if p.owner == "Blue")
-        redScore = sum(p.health for p in self.planets if p.owner == "Red")
+        blueScore, redScore = self.view._scores()
 
-        # Render score text
-        blueText = self.font.render(str(blueScore), True, WHITE)
-        redText = self.font.render(str(redScore), True, WHITE)
+        # Render score text (cached until the value changes)
+        blueText = self.text.render(str(blueScore), WHITE)
+        redText = self.text.render(str(redScore), WHITE)
 
         # Center text in the boxes
         blueTextRect = blueText.get_rect(center=(boxRight[0] + panelW // 2, boxRight[1] + panelH // 2))
@@ -432,79 +561,97 @@ class Game:
         for p in self.planets:
             planet_status += str(p.shots) + " "
 
-        txt = f"Shots :  {planet_status}   | Player: {self.current_player().name} | A/D angle | W/S speed | SPACE fire | Click a tower"
-        self.screen.blit(self.font.render(txt, True, WHITE), (12,10))
-
-        panel = pygame.Surface((260, 170), pygame.SRCALPHA)
-        panel.fill((20,30,52,200))
-        y = 10
+        txt = f"Shots :  {planet_status}   | Player: {self.current_player().name} | A/D angle | W/S speed | SPACE fire | F fan | P profile | Click a tower"
+        self.screen.blit(self.text.render(txt, WHITE), (12,10))
 
-        def wr(s):
-            nonlocal y
-            panel.blit(self.font.render(s, True, WHITE), (10,y)); y += 22
-        wr(f"Selected: {self.selected_site.planet.name if self.selected_site else 'None'}")
+        lines = [f"Selected: {self.selected_site.planet.name if self.selected_site else 'None'}"]
         if self.selected_site:
             deg = math.degrees(self.selected_site.planned_angle_offset)
-            wr(f"Angle offset: {deg:+.1f}° (±{ANGLE_LIMIT_DEG}°)")
-            wr(f"Speed: {self.selected_site.planned_speed:.0f}")
-        wr(f"Queued shots: {len(self.queued_shots)}")
-        self.screen.blit(panel, (cfg.WIDTH-280, 50))
-
-    def draw(self):
-        self.screen.blit(self.bg, (0, 0))
-
-        # star composite
-        sun_layer = pygame.Surface((cfg.WIDTH, cfg.HEIGHT), pygame.SRCALPHA)
-        pygame.draw.circle(sun_layer, (255, 223, 0), cfg.CENTER, 30)
-        sun1 = fade_surface(self.sunone_frames[self.sunone_index], 0.2)
-        sun2 = fade_surface(self.suntwo_frames[self.suntwo_index], 0.4)
-        sun2 = pygame.transform.rotozoom(sun2, 0, 0.8)
-        rect1 = sun1.get_rect(center=cfg.CENTER)
-        rect2 = sun2.get_rect(center=cfg.CENTER)
-        sun_layer.blit(sun1, rect1)
-        sun_layer.blit(sun2, rect2)
-        self.screen.blit(sun_layer, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
-
-        # orbits
-        for p in self.planets:
-            pygame.draw.circle(self.screen, (255, 255, 255, 30), cfg.CENTER, int(p.orbit_radius), 1)
-
-        # planets & towers
-        for p in self.planets:
-            p.draw(self.screen)
-            for s in p.sites:
-                s.draw(self.screen, highlight=(s == self.selected_site))
-
-        # rockets
-        for r in self.rockets:
-            r.draw(self.screen)
-
-        # effects
-        for fx in self.effects:
-            fx.draw(self.screen)
-
-        # preview
-        if self.selected_site and len(self.preview_traj) > 2:
-            try:
-                pygame.draw.aalines(self.screen, (255, 255, 180), False, self.preview_traj, 1)
-            except Exception:
-                pass
-
-        self.draw_ui()
+            lines.append(f"Angle offset: {deg:+.1f}° (±{ANGLE_LIMIT_DEG}°)")
+            lines.append(f"Speed: {self.selected_site.planned_speed:.0f}")
+        lines.append(f"Queued shots: {self.queued_shot_count}")
+
+        # side panel is rebuilt only when its text changes
+        lines = tuple(lines)
+        if lines != self._panel_lines:
+            self._panel.fill((20,30,52,200))
+            y = 10
+            for s in lines:
+                self._panel.blit(self.text.render(s, WHITE), (10,y)); y += 22
+            self._panel_lines = lines
+        add(self.screen.blit(self._panel, (cfg.WIDTH-280, 50)))
+
+    def draw(self, alpha=1.0):
+        """Render the world `alpha` (0..1) of the way from the previous sim tick to
+        the current one, so motion stays smooth at any frame rate."""
+        # restore the cached background/orbits under whatever moved last frame
+        if self.static.ensure(self.planets, cfg.CENTER):
+            self.dirty.force_full()
+        self.dirty.erase(self.static)
+        add = self.dirty.add
+        world, scale = self.world, self.render_scale
+
+        # star composite (pre-built, see render.SunCompositor)
+        with profiler.scope("sun"):
+            center = (int(cfg.CENTER[0] * scale), int(cfg.CENTER[1] * scale))
+            add(self.sun.draw(world, center, self.sunone_index, self.suntwo_index, scale))
+
+        with profiler.scope("entities"):
+            # planets & towers
+            for p in self.planets:
+                add(p.draw(world, alpha, scale))
+                for s in p.sites:
+                    add(s.draw(world, highlight=(s == self.selected_site), alpha=alpha, scale=scale))
+
+            # rockets (trails first: only the newest segments are drawn, then faded in bulk)
+            self.trails.update(self.rockets)
+            add(self.trails.draw(world))
+            for r in self.rockets:
+                add(r.draw(world, alpha, scale))
+
+            # effects
+            for fx in self.effects:
+                add(fx.draw(world, scale))
+
+            # preview (aim-assist fan underneath the planned shot's path)
+            if self.show_fan and self.selected_site:
+                add(self.fan.draw(world, scale))
+            if self.selected_site and len(self.preview_traj) > 2:
+                traj = self.preview_traj
+                if scale != 1.0:
+                    traj = [(x * scale, y * scale) for x, y in traj]
+                try:
+                    add(pygame.draw.aalines(world, (255, 255, 180), False, traj, 1))
+                except Exception:
+                    pass
+
+        # the HUD goes on the screen at full resolution, over the stretched world
+        if self.upscaler:
+            with profiler.scope("upscale"):
+                self.upscaler.stretch(self.dirty)
+        with profiler.scope("ui"):
+            self.draw_ui()
+            if self.show_profile:
+                self.hud.add(self.profile_overlay.draw(self.screen, profiler, (10, 50)))
 
         # <<< important >>>
         if self.game_over:
             self.draw_finish_screen()
 
-        pygame.display.flip()
+        with profiler.scope("flip"):
+            self.hud.present()
 
     def handle_events(self):
+        human = self.current_player().name not in self.ai
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                self.select_site_by_click(*event.pos)
+                if human:
+                    self.select_site_by_click(*event.pos)
             elif event.type == pygame.KEYDOWN:
+                if not human and event.key in (pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s, pygame.K_SPACE):
+                    continue
                 if event.key == pygame.K_a:
                     self.plan_adjust(dx_angle=-math.radians(2))
                 elif event.key == pygame.K_d:
@@ -516,23 +663,81 @@ class Game:
                 elif event.key == pygame.K_SPACE:
 
                     self.queue_shot()
+                elif event.key == pygame.K_f:
+                    self.show_fan = not self.show_fan
+                    self.fan.paths = None
+                    self.invalidate_preview()
+                elif event.key == pygame.K_p:
+                    self.show_profile = not self.show_profile
+                    profiler.enabled = self.show_profile or profiler.trace is not None
+                elif event.key == pygame.K_t:
+                    self.toggle_trace()
                 elif event.key == pygame.K_ESCAPE:
                     self.running = False
+                elif self.replay and event.key == pygame.K_RIGHT:
+                    self.seek_replay(+cfg.REPLAY_SEEK_TICKS)
+                elif self.replay and event.key == pygame.K_LEFT:
+                    self.seek_replay(-cfg.REPLAY_SEEK_TICKS)
+
+    def toggle_trace(self, path=PROFILE_TRACE_FILE):
+        """Start recording a Chrome trace, or save the one being recorded."""
+        if profiler.trace is None:
+            profiler.start_trace()
+            return
+        n = profiler.save_trace(path)
+        profiler.enabled = self.show_profile
+        print(f"wrote {n} trace events to {path}")
 
     def run(self):
         # auto-select first owned site
-        if not self.selected_site:
+        if not self.selected_site and not self.replay:
             for p in self.planets:
                 for s in p.sites:
                     # s.owner is a string identifier; match against player name
                     if s.owner == self.current_player().name:
                         self.selected_site = s
-                        self.update_preview()
+                        self.invalidate_preview()
                         break
                 if self.selected_site: break
-
+        if self.quality:
+            self.governor = QualityGovernor(STEPS)
+        if self.worker:
+            return self._run_threaded()
+
+        # fixed-step simulation, free-running render: real frame time is banked in
+        # an accumulator and spent in whole SIM_STEP ticks; draw() interpolates
+        # between the last two ticks with whatever is left over
+        acc = 0.0
+        self.clock.tick()
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
+            frame = min(self.clock.tick(self.fps_cap) / 1000.0, cfg.MAX_FRAME_TIME)
+            acc += frame
+            t0 = time.perf_counter()
+            with profiler.scope("frame"):
+                self.handle_events()
+                while acc >= cfg.SIM_STEP:
+                    self.update()
+                    acc -= cfg.SIM_STEP
+                with profiler.scope("ai"):
+                    self.update_ai()
+                self.draw(acc / cfg.SIM_STEP)
+            self._govern(time.perf_counter() - t0)
+
+    def _run_threaded(self):
+        """Render loop while the SimWorker steps the world in real time: draw the
+        newest snapshot, interpolated by how long ago it was published."""
+        self.worker.start()
+        try:
+            while self.running:
+                self.clock.tick(self.fps_cap)
+                t0 = time.perf_counter()
+                with profiler.scope("frame"):
+                    self.handle_events()
+                    snap = self._sync_worker()
+                    with profiler.scope("ai"):
+                        self.update_ai()
+                    alpha = (time.perf_counter() - snap.published) / cfg.SIM_STEP
+                    self.draw(min(1.0, max(0.0, alpha)))
+                self._govern(time.perf_counter() - t0)
+        finally:
+            self.worker.stop()
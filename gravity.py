@@ -0,0 +1,200 @@
+"""Gravity fields: acceleration of many rockets due to many point masses.
+
+Integrators only ever call field.accel(pos) and field.nearest(pos), so the
+way gravity is summed is a per-match backend (Simulation(gravity=...)):
+
+    direct       Field: exact O(rockets x bodies) sum; best for a few bodies
+    barnes-hut   BarnesHutField: quadtree approximation, O(rockets x log bodies)
+                 per tick plus an O(bodies log bodies) build; BH_THETA trades
+                 accuracy for speed (see gravity_bench.py for the crossover)
+"""
+import math
+import numpy as np
+import settings as cfg
+
+SOFTENING = 1e-6   # added to r^2 so a rocket on top of a body stays finite
+
+class Field:
+    """Point masses at `bodies` ((m, 2)) with gravitational parameters `gm` ((m,))."""
+    def __init__(self, bodies, gm):
+        self.bodies = bodies
+        self.gm = gm
+
+    def accel(self, pos):
+        d = self.bodies[None, :, :] - pos[:, None, :]       # (n, bodies, 2)
+        r2 = (d * d).sum(axis=2) + SOFTENING
+        invr3 = 1.0 / (r2 * np.sqrt(r2))
+        return (self.gm[None, :, None] * d * invr3[:, :, None]).sum(axis=1)
+
+    def nearest(self, pos):
+        """Distance from each row of `pos` to its closest body."""
+        d = self.bodies[None, :, :] - pos[:, None, :]
+        return np.sqrt((d * d).sum(axis=2).min(axis=1))
+
+class PointField:
+    """Field for one rocket in plain floats: `bodies` is a list of (x, y, gm)."""
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def accel(self, x, y):
+        ax = ay = 0.0
+        for bx, by, gm in self.bodies:
+            dx, dy = bx - x, by - y
+            r2 = dx * dx + dy * dy + SOFTENING
+            f = gm / (r2 * math.sqrt(r2))
+            ax += f * dx
+            ay += f * dy
+        return ax, ay
+
+    def nearest(self, x, y):
+        return math.sqrt(min((bx - x) ** 2 + (by - y) ** 2 for bx, by, _ in self.bodies))
+
+def _spread_bits(v):
+    """Interleave zeros between the low 16 bits of each int (Morton halves)."""
+    v = v & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+class BarnesHutField(Field):
+    """Barnes-Hut quadtree over the bodies, built once per field.
+
+    Bodies are sorted by Morton key, so every quadtree cell is a contiguous
+    run of bodies and each level of the tree is a few array reductions over
+    the sorted keys (no Python per body). accel() walks all rockets down the
+    tree together, one level per iteration: a (rocket, cell) pair whose cell
+    is a single body or looks smaller than `theta` radians from the rocket
+    contributes its total mass at its centre of mass; otherwise it is
+    replaced by pairs for the cell's children. nearest() walks the same way,
+    dropping a cell once its bounding box is farther than the closest body
+    found so far.
+    """
+    def __init__(self, bodies, gm, theta=None, max_depth=None):
+        super().__init__(bodies, gm)
+        # settings are read here, not at import, so tournament.py overrides apply
+        self.theta = cfg.BH_THETA if theta is None else theta
+        self._build(cfg.BH_MAX_DEPTH if max_depth is None else max_depth)
+
+    def _build(self, max_depth):
+        b = self.bodies
+        lo = b.min(axis=0)
+        self.size = max(float((b.max(axis=0) - lo).max()), 1e-9) * (1 + 1e-9)
+        cells = 1 << max_depth
+        q = np.minimum(((b - lo) * (cells / self.size)).astype(np.int64), cells - 1)
+        keys = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << 1)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        m = self.gm[order]
+        mp = b[order] * m[:, None]
+        self._sorted = b[order]
+        self._boxes = None     # per level: low and high corners of each cell's bodies
+        n = len(keys)
+
+        # level l: cells of side size / 2**l, identified by the top 2l key bits
+        self.levels = []
+        for level in range(max_depth + 1):
+            prefix = keys >> (2 * (max_depth - level))
+            start = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            count = np.diff(np.r_[start, n])
+            mass = np.add.reduceat(m, start)
+            com = np.add.reduceat(mp, start) / mass[:, None]
+            leaf = count == 1
+            self.levels.append([start, count, mass, com, leaf, None, None])
+            if leaf.all():
+                break
+        self.levels[-1][4][:] = True     # the deepest level is all leaves
+        # children of a cell: the next level's cells that start inside its run
+        for parent, child in zip(self.levels, self.levels[1:]):
+            start, count = parent[0], parent[1]
+            parent[5] = np.searchsorted(child[0], start)
+            parent[6] = np.searchsorted(child[0], start + count)
+
+    def accel(self, pos):
+        n = len(pos)
+        ax = np.zeros(n)
+        ay = np.zeros(n)
+        rocket = np.arange(n)
+        cell = np.zeros(n, dtype=np.int64)     # level 0 is a single root cell
+        theta2 = self.theta * self.theta
+        for level, (start, count, mass, com, leaf, child_lo, child_hi) in enumerate(self.levels):
+            d = com[cell] - pos[rocket]
+            r2 = (d * d).sum(axis=1) + SOFTENING
+            side = self.size / (1 << level)
+            far = leaf[cell] | (side * side < theta2 * r2)
+
+            f = mass[cell[far]] / (r2[far] * np.sqrt(r2[far]))
+            ax += np.bincount(rocket[far], weights=f * d[far, 0], minlength=n)
+            ay += np.bincount(rocket[far], weights=f * d[far, 1], minlength=n)
+
+            near = ~far
+            if not near.any():
+                break
+            rocket, cell = rocket[near], cell[near]
+            lo, k = child_lo[cell], child_hi[cell] - child_lo[cell]
+            first = np.cumsum(k) - k
+            rocket = np.repeat(rocket, k)
+            cell = np.repeat(lo, k) + (np.arange(int(k.sum())) - np.repeat(first, k))
+        return np.stack([ax, ay], axis=1)
+
+    def nearest(self, pos):
+        n = len(pos)
+        b = self._sorted
+        if self._boxes is None:      # only adaptive steps ask, so built on first use
+            self._boxes = [(np.minimum.reduceat(b, lv[0]), np.maximum.reduceat(b, lv[0])) for lv in self.levels]
+        best = np.full(n, np.inf)       # squared distance to the closest body seen
+        rocket = np.arange(n)
+        cell = np.zeros(n, dtype=np.int64)
+        for (start, count, _, _, leaf, child_lo, child_hi), (lo, hi) in zip(self.levels, self._boxes):
+            # any body of the cell bounds the answer from above: take its first
+            p = pos[rocket]
+            d = b[start[cell]] - p
+            np.minimum.at(best, rocket, (d * d).sum(axis=1))
+            # the cell's bounding box bounds it from below
+            g = np.maximum(lo[cell] - p, 0.0) + np.maximum(p - hi[cell], 0.0)
+            open_ = (g * g).sum(axis=1) < best[rocket]
+            # deepest-level cells can hold several bodies at (almost) one spot
+            multi = open_ & leaf[cell] & (count[cell] > 1)
+            if multi.any():
+                r, c = rocket[multi], cell[multi]
+                k = count[c]
+                first = np.cumsum(k) - k
+                idx = np.repeat(start[c], k) + (np.arange(int(k.sum())) - np.repeat(first, k))
+                d = b[idx] - pos[np.repeat(r, k)]
+                np.minimum.at(best, np.repeat(r, k), (d * d).sum(axis=1))
+            open_ &= ~leaf[cell]
+            if not open_.any():
+                break
+            rocket, cell = rocket[open_], cell[open_]
+            child, k = child_lo[cell], child_hi[cell] - child_lo[cell]
+            first = np.cumsum(k) - k
+            rocket = np.repeat(rocket, k)
+            cell = np.repeat(child, k) + (np.arange(int(k.sum())) - np.repeat(first, k))
+        return np.sqrt(best)
+
+class DirectGravity:
+    name = "direct"
+    theta = 0.0
+
+    def field(self, bodies, gm):
+        return Field(bodies, gm)
+
+class BarnesHutGravity:
+    name = "barnes-hut"
+
+    def __init__(self, theta=None):
+        self.theta = cfg.BH_THETA if theta is None else theta
+
+    def field(self, bodies, gm):
+        return BarnesHutField(bodies, gm, self.theta)
+
+GRAVITY_BACKENDS = ("direct", "barnes-hut")
+
+def get_gravity(name, theta=None):
+    """A gravity backend by name (one of GRAVITY_BACKENDS)."""
+    if name == "direct":
+        return DirectGravity()
+    if name == "barnes-hut":
+        return BarnesHutGravity(theta)
+    raise ValueError(f"unknown gravity backend {name!r} (expected one of {', '.join(GRAVITY_BACKENDS)})")
@@ -0,0 +1,58 @@
+"""Direct-sum vs Barnes-Hut gravity: where does the tree start paying off?
+
+Times one tick's worth of field construction plus accel() for a swarm of
+rockets over random systems of increasing size, and reports each backend's
+cost, the tree's median relative error, and the crossover body count.
+
+    python gravity_bench.py [--rockets 64] [--theta 0.5]
+"""
+import argparse, time
+import numpy as np
+from gravity import get_gravity
+
+def _time(fn, min_time=0.2):
+    fn()
+    n, t0 = 0, time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            return elapsed / n
+
+def run(rockets=64, theta=0.5, sizes=(4, 16, 64, 256, 1024, 4096), seed=0):
+    rng = np.random.default_rng(seed)
+    direct, tree = get_gravity("direct"), get_gravity("barnes-hut", theta)
+    rows, crossover = [], None
+    for m in sizes:
+        # a disc of bodies around a heavy star, like the game's playfield
+        ang = rng.uniform(0, 2 * np.pi, m)
+        rad = 600 * np.sqrt(rng.uniform(0, 1, m))
+        bodies = np.stack([640 + rad * np.cos(ang), 360 + rad * np.sin(ang)], axis=1)
+        bodies[0] = (640, 360)
+        gm = rng.uniform(1e5, 2e6, m)
+        gm[0] = 6e6
+        pos = rng.uniform((0, 0), (1280, 720), (rockets, 2))
+
+        t_direct = _time(lambda: direct.field(bodies, gm).accel(pos))
+        t_tree = _time(lambda: tree.field(bodies, gm).accel(pos))
+        exact = direct.field(bodies, gm).accel(pos)
+        err = np.linalg.norm(tree.field(bodies, gm).accel(pos) - exact, axis=1) / np.linalg.norm(exact, axis=1)
+        rows.append((m, t_direct, t_tree, float(np.median(err))))
+        if crossover is None and t_tree < t_direct:
+            crossover = m
+    return rows, crossover
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rockets", type=int, default=64)
+    ap.add_argument("--theta", type=float, default=0.5)
+    args = ap.parse_args()
+
+    rows, crossover = run(args.rockets, args.theta)
+    print(f"{args.rockets} rockets, theta={args.theta}")
+    print(f"{'bodies':>7} {'direct ms':>10} {'tree ms':>10} {'median err':>11}")
+    for m, td, tt, err in rows:
+        print(f"{m:>7} {td * 1e3:>10.3f} {tt * 1e3:>10.3f} {err:>11.2e}")
+    print(f"barnes-hut is faster from {crossover} bodies" if crossover
+          else "direct sum was faster at every size tried")
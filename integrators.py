@@ -0,0 +1,110 @@
+"""Rocket integrators: one step of (pos, vel) arrays through a gravity field.
+
+Every integrator steps (n, 2) position/velocity arrays in place through a
+gravity.Field (or any backend with the same accel/nearest methods), so the
+same object drives the RocketSwarm and the aim fan (n = paths); step1() is
+the same scheme on plain floats through a gravity.PointField, for the single
+planned-shot preview where NumPy's per-call overhead would dominate. Bodies
+don't move within a step. Euler and Leapfrog also take `dt` as an (n, 1)
+column of per-row steps.
+
+    euler      semi-implicit Euler, one force evaluation (the original physics)
+    leapfrog   kick-drift-kick, symplectic: orbits don't spiral in or out
+    adaptive   leapfrog, substepped per rocket near a body (see Adaptive)
+"""
+import math
+import numpy as np
+import settings as cfg
+
+class Euler:
+    name = "euler"
+
+    def step(self, pos, vel, field, dt):
+        vel += field.accel(pos) * dt
+        pos += vel * dt
+
+    def step1(self, x, y, vx, vy, field, dt):
+        ax, ay = field.accel(x, y)
+        vx += ax * dt
+        vy += ay * dt
+        return x + vx * dt, y + vy * dt, vx, vy
+
+class Leapfrog:
+    name = "leapfrog"
+
+    def step(self, pos, vel, field, dt):
+        vel += field.accel(pos) * (0.5 * dt)
+        pos += vel * dt
+        vel += field.accel(pos) * (0.5 * dt)
+
+    def step1(self, x, y, vx, vy, field, dt):
+        ax, ay = field.accel(x, y)
+        vx += ax * 0.5 * dt
+        vy += ay * 0.5 * dt
+        x += vx * dt
+        y += vy * dt
+        ax, ay = field.accel(x, y)
+        return x, y, vx + ax * 0.5 * dt, vy + ay * 0.5 * dt
+
+class Adaptive:
+    """Wraps another integrator and splits each rocket's step into up to
+    ADAPTIVE_MAX_SUBSTEPS substeps of at most ADAPTIVE_ETA times its local
+    time scale, min(r / |v|, sqrt(r / |a|)) for distance r to the nearest
+    body. Far from everything that is one substep, so the cost is only paid
+    on close approaches."""
+    name = "adaptive"
+
+    def __init__(self, base=None, eta=None, max_substeps=None):
+        self.base = base or Leapfrog()
+        # settings are read here, not at import, so tournament.py overrides apply
+        self.eta = cfg.ADAPTIVE_ETA if eta is None else eta
+        self.max_substeps = cfg.ADAPTIVE_MAX_SUBSTEPS if max_substeps is None else max_substeps
+
+    def substeps(self, pos, vel, field, dt):
+        r = field.nearest(pos) + 1e-6
+        v = np.sqrt((vel * vel).sum(axis=1)) + 1e-9
+        a = field.accel(pos)
+        a = np.sqrt((a * a).sum(axis=1)) + 1e-9
+        h = self.eta * np.minimum(r / v, np.sqrt(r / a))
+        return np.clip(np.ceil(np.abs(dt) / h), 1, self.max_substeps).astype(int)
+
+    def substeps1(self, x, y, vx, vy, field, dt):
+        r = field.nearest(x, y) + 1e-6
+        v = math.hypot(vx, vy) + 1e-9
+        a = math.hypot(*field.accel(x, y)) + 1e-9
+        h = self.eta * min(r / v, math.sqrt(r / a))
+        return int(min(max(math.ceil(abs(dt) / h), 1), self.max_substeps))
+
+    def step1(self, x, y, vx, vy, field, dt):
+        n = self.substeps1(x, y, vx, vy, field, dt)
+        for _ in range(n):
+            x, y, vx, vy = self.base.step1(x, y, vx, vy, field, dt / n)
+        return x, y, vx, vy
+
+    def step(self, pos, vel, field, dt):
+        if len(pos) == 0:
+            return
+        n_sub = self.substeps(pos, vel, field, dt)
+        most = int(n_sub.max())
+        if most == 1:
+            self.base.step(pos, vel, field, dt)
+            return
+        h = (dt / n_sub)[:, None]
+        for k in range(most):
+            idx = np.flatnonzero(n_sub > k)
+            p, v = pos[idx], vel[idx]
+            self.base.step(p, v, field, h[idx])
+            pos[idx] = p
+            vel[idx] = v
+
+INTEGRATORS = ("euler", "leapfrog", "adaptive")
+
+def get_integrator(name):
+    """An integrator by name (one of INTEGRATORS)."""
+    if name == "euler":
+        return Euler()
+    if name == "leapfrog":
+        return Leapfrog()
+    if name == "adaptive":
+        return Adaptive()
+    raise ValueError(f"unknown integrator {name!r} (expected one of {', '.join(INTEGRATORS)})")
@@ -1,7 +1,52 @@
+import argparse
 import pygame
 from game import Game
+from sim import Simulation
+from replay import ReplayRecorder, Replay, ReplayPlayer
+from integrators import INTEGRATORS
+from gravity import GRAVITY_BACKENDS
+from profiler import profiler
+import settings as cfg
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="I.S.A.C. — InterStellar Artillery Commander")
+    ap.add_argument("--seed", type=int, help="play a deterministic match from this seed")
+    ap.add_argument("--record", metavar="FILE", help="write a replay of this match")
+    ap.add_argument("--replay", metavar="FILE", help="watch a recorded match (LEFT/RIGHT to seek)")
+    ap.add_argument("--integrator", choices=INTEGRATORS, default=cfg.INTEGRATOR,
+                    help="rocket integrator for this match")
+    ap.add_argument("--gravity", choices=GRAVITY_BACKENDS, default=cfg.GRAVITY,
+                    help="gravity backend (barnes-hut for very many bodies)")
+    ap.add_argument("--theta", type=float, default=cfg.BH_THETA, help="Barnes-Hut opening angle")
+    ap.add_argument("--threaded", action="store_true", help="run the simulation on a worker thread")
+    ap.add_argument("--ai", action="append", choices=("Blue", "Red"), default=[],
+                    help="let the computer play this side (repeatable)")
+    ap.add_argument("--profile", action="store_true", help="start with the profiler overlay shown (P)")
+    ap.add_argument("--trace", metavar="FILE", help="record a Chrome trace of the session to FILE")
+    ap.add_argument("--no-governor", dest="quality", action="store_false",
+                    help="keep full rendering quality even when frames run over budget")
+    args = ap.parse_args()
+
     pygame.mixer.pre_init(44100, -16, 2, 512)
     pygame.init()
-    Game().run()
+
+    recorder = None
+    if args.replay:
+        player = ReplayPlayer(Replay.load(args.replay))
+        game = Game(sim=player.seek(0), size=player.replay.size, replay=player,
+                    quality=args.quality)
+    else:
+        sim = Simulation(seed=args.seed, integrator=args.integrator,
+                         gravity=args.gravity, theta=args.theta)
+        game = Game(sim=sim, threaded=args.threaded, ai=args.ai, quality=args.quality)
+        recorder = ReplayRecorder(args.record, sim) if args.record else None
+    game.show_profile = profiler.enabled = args.profile
+    if args.trace:
+        profiler.start_trace()
+    try:
+        game.run()
+    finally:
+        if recorder:
+            recorder.close()
+        if args.trace:
+            profiler.save_trace(args.trace)
@@ -0,0 +1,180 @@
+import numpy as np
+import settings as cfg
+from settings import G, STAR_MASS, STAR_COLLISION_RADIUS, ROCKET_DAMAGE, TRAIL_LENGTH
+from integrators import Euler
+from gravity import DirectGravity
+
+def _segment_circle_entry(p0, d, c, r):
+    """Fraction t in [0, 1] along each segment p0 -> p0 + d where it first
+    touches circle (c, r); 0 if it starts inside, NaN if it never touches.
+    All arguments are row-aligned arrays ((k, 2) or (k,))."""
+    f = p0 - c
+    a = (d * d).sum(axis=1) + 1e-12
+    b = 2.0 * (f * d).sum(axis=1)
+    cc = (f * f).sum(axis=1) - r * r
+    disc = b * b - 4.0 * a * cc
+    with np.errstate(invalid="ignore"):
+        t = (-b - np.sqrt(disc)) / (2.0 * a)
+    t = np.where(cc <= 0.0, 0.0, t)
+    return np.where((disc >= 0.0) & (t >= 0.0) & (t <= 1.0), t, np.nan)
+
+def _first_contacts(p0, seg, centers, radii, ri, bj):
+    """Candidate pairs (segment ri of p0 -> p0 + seg, circle bj of centers/
+    radii) narrowed to the first circle each segment touches: (ri, bj, t)
+    arrays, one entry per segment that touches anything. Ties go to the
+    lower circle index."""
+    t = _segment_circle_entry(p0[ri], seg[ri], centers[bj], radii[bj])
+    hit = ~np.isnan(t)
+    ri, bj, t = ri[hit], bj[hit], t[hit]
+    order = np.lexsort((bj, t, ri))
+    ri, bj, t = ri[order], bj[order], t[order]
+    first = np.ones(len(ri), dtype=bool)
+    first[1:] = ri[1:] != ri[:-1]
+    return ri[first], bj[first], t[first]
+
+
+class RocketSwarm:
+    """Struct-of-arrays store for every live rocket, stepped as one batch.
+
+    Row ``i`` of ``pos``/``vel`` belongs to ``rockets[i]``; each Rocket's own
+    ``pos``/``vel`` are views into those rows, so entity code keeps working.
+    Trails are a fixed-size ring buffer per row: ``trail[i, k % TRAIL_LENGTH]``
+    is the k-th point rocket i ever recorded, ``trail_count[i]`` how many.
+    Motion is delegated to ``integrator`` (see integrators.py), through a
+    field from the ``gravity`` backend (see gravity.py).
+    """
+    def __init__(self, capacity=64, integrator=None, gravity=None):
+        self.integrator = integrator or Euler()
+        self.gravity = gravity or DirectGravity()
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.prev_pos = np.zeros((capacity, 2))   # last tick's positions (render lerp)
+        self.trail = np.zeros((capacity, TRAIL_LENGTH, 2), dtype=np.int32)
+        self.trail_count = np.zeros(capacity, dtype=np.int64)
+        self.rockets = []
+
+    def __len__(self):
+        return len(self.rockets)
+
+    def __iter__(self):
+        return iter(self.rockets)
+
+    def _grow(self):
+        cap = self.pos.shape[0] * 2
+        for name in ("pos", "vel", "prev_pos", "trail", "trail_count"):
+            old = getattr(self, name)
+            new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:len(self.rockets)] = old[:len(self.rockets)]
+            setattr(self, name, new)
+        self._rebind()
+
+    def _rebind(self):
+        for i, r in enumerate(self.rockets):
+            r.pos = self.pos[i]
+            r.vel = self.vel[i]
+            r.prev_pos = self.prev_pos[i]
+
+    def add(self, rocket):
+        if len(self.rockets) == self.pos.shape[0]:
+            self._grow()
+        i = len(self.rockets)
+        self.pos[i] = rocket.pos
+        self.vel[i] = rocket.vel
+        self.prev_pos[i] = rocket.pos
+        self.trail_count[i] = 0
+        self.rockets.append(rocket)
+        rocket.pos = self.pos[i]
+        rocket.vel = self.vel[i]
+        rocket.prev_pos = self.prev_pos[i]
+
+    def compact(self):
+        """Drop dead rockets, packing the survivors to the front of the buffers.
+        Returns the rockets that were dropped."""
+        keep = [i for i, r in enumerate(self.rockets) if r.alive]
+        if len(keep) == len(self.rockets):
+            return []
+        dead = [r for r in self.rockets if not r.alive]
+        n = len(keep)
+        self.pos[:n] = self.pos[keep]
+        self.vel[:n] = self.vel[keep]
+        self.prev_pos[:n] = self.prev_pos[keep]
+        self.trail[:n] = self.trail[keep]
+        self.trail_count[:n] = self.trail_count[keep]
+        self.rockets = [self.rockets[i] for i in keep]
+        self._rebind()
+        return dead
+
+    def trail_points(self, i, since=0):
+        """Trail of row i from its `since`-th recorded point on (at most the last
+        TRAIL_LENGTH), oldest first, as an (k, 2) int array."""
+        count = int(self.trail_count[i])
+        start = max(since, count - TRAIL_LENGTH, 0)
+        idx = np.arange(start, count) % TRAIL_LENGTH
+        return self.trail[i, idx]
+
+    def step(self, ephem, dt, star_mass=STAR_MASS):
+        """Gravity, integration and star/planet collisions for all rockets,
+        against the planets of an ephemeris.Ephemeris at this tick.
+        Returns the rockets that died this step."""
+        n = len(self.rockets)
+        if n == 0:
+            return []
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        self.prev_pos[:n] = pos
+        planets = ephem.planets
+
+        # bodies: star first, then planets (same order as the scalar integrator)
+        bodies = np.empty((len(planets) + 1, 2))
+        bodies[0] = cfg.CENTER
+        bodies[1:] = ephem.pos
+        gm = np.empty(len(planets) + 1)
+        gm[0] = G * star_mass
+        gm[1:] = ephem.gm
+
+        self.integrator.step(pos, vel, self.gravity.field(bodies, gm), dt)
+
+        self._collide(ephem, bodies)
+
+        # trails: one ring-buffer write per rocket, no per-rocket Python work
+        count = self.trail_count[:n]
+        self.trail[np.arange(n), count % TRAIL_LENGTH] = np.clip(pos, -1e6, 1e6)
+        count += 1
+
+        return self.compact()
+
+    def _collide(self, ephem, bodies):
+        """Swept collisions: each rocket's path this tick (prev_pos -> pos) is
+        tested against the star and every planet at their current positions,
+        so fast rockets can't tunnel through. Broad phase: a body on orbit R
+        with radius r can only be touched by a path whose distance from the
+        star overlaps [R - r, R + r]; a path of length L that ends r0 and r1
+        from the star stays within [min(r0, r1) - L/2, max(r0, r1)]. A hit
+        rocket is stopped at the point of
+        impact; the first body along its path (a planet) takes the damage."""
+        n = len(self.rockets)
+        pos = self.pos[:n]
+        p0 = self.prev_pos[:n]
+        seg = pos - p0
+        center = bodies[0]
+        orbit = np.concatenate(([0.0], ephem.orbit_radius))
+        radii = np.concatenate(([float(STAR_COLLISION_RADIUS)], ephem.radius))
+
+        d0 = p0 - center
+        d1 = pos - center
+        r0 = np.sqrt(np.einsum("ij,ij->i", d0, d0))
+        r1 = np.sqrt(np.einsum("ij,ij->i", d1, d1))
+        rmin = np.minimum(r0, r1) - 0.5 * np.sqrt(np.einsum("ij,ij->i", seg, seg))
+        cand = (rmin[:, None] <= orbit + radii) & (np.maximum(r0, r1)[:, None] >= orbit - radii)
+        ri, bj = np.nonzero(cand)
+        if len(ri) == 0:
+            return
+
+        # earliest contact per rocket (ties: star, then planets in list order)
+        ri, bj, t = _first_contacts(p0, seg, bodies, radii, ri, bj)
+        planets = ephem.planets
+        for i, j, tt in zip(ri.tolist(), bj.tolist(), t.tolist()):
+            pos[i] = p0[i] + seg[i] * tt
+            if j > 0:
+                planets[j - 1].take_damage(ROCKET_DAMAGE)
+            self.rockets[i].alive = False
@@ -0,0 +1,159 @@
+"""Aim-assist fan: every aim a launch site allows, integrated as one batch.
+
+The fan covers FAN_ANGLES offsets across +-ANGLE_LIMIT_DEG times FAN_SPEEDS
+speeds across MIN_SPEED..MAX_SPEED. Planet positions for the whole preview
+horizon come from the ephemeris lookahead table, so each integration
+step is a handful of NumPy operations over all paths at once. Unlike the
+planned-shot preview, which follows the match's integrator, the fan steps
+with semi-implicit Euler at a fixed dt whatever the match, so a rebuild of
+all its paths costs the same in every match. Each path is coloured by what it runs into first:
+an enemy planet, one of our own, or nothing (the star, the edge of the
+screen or the end of the horizon); hits are swept like RocketSwarm's.
+Only every FAN_STRIDE-th point (and each path's last one) is kept for
+drawing.
+"""
+import math, pygame
+import numpy as np
+import settings as cfg
+from gravity import SOFTENING
+from physics import _first_contacts
+from settings import (DT, PREVIEW_DT_SCALE, PREVIEW_STEPS, G, STAR_MASS, STAR_COLLISION_RADIUS,
+                      ANGLE_LIMIT_DEG, MIN_SPEED, MAX_SPEED, FAN_ANGLES, FAN_SPEEDS, FAN_STRIDE, FAN_COLORS)
+
+MISS, HIT_ENEMY, HIT_OWN = 0, 1, 2
+
+class FanPreview:
+    def __init__(self, angles=FAN_ANGLES, speeds=FAN_SPEEDS, steps=PREVIEW_STEPS, stride=FAN_STRIDE):
+        lim = math.radians(ANGLE_LIMIT_DEG)
+        a, s = np.meshgrid(np.linspace(-lim, lim, angles), np.linspace(MIN_SPEED, MAX_SPEED, speeds))
+        self.offsets = a.ravel()
+        self.speeds = s.ravel()
+        self.steps = steps
+        self.stride = stride
+        self.paths = None      # (paths, points, 2) positions, launch point first
+        self.ends = None       # valid points per path
+        self.outcome = None    # MISS / HIT_ENEMY / HIT_OWN per path
+        self._origin = None    # launch frame (x, y, direction) the paths were built in
+        self._drawn = None     # cached per-path point lists for draw()
+        self._drawn_scale = None
+
+    def _launch_frame(self, site):
+        (x, y), tower_ang = site.get_world_pos()
+        return x, y, tower_ang - math.pi / 2
+
+    def build(self, site, ephem):
+        """Integrate every path of the fan from `site`'s current launch frame,
+        against the planets of an ephemeris.Ephemeris."""
+        x, y, base = self._launch_frame(site)
+        n, steps = len(self.offsets), self.steps
+        dt = DT * PREVIEW_DT_SCALE
+
+        # body columns, star first; row i is where they are after i + 1 steps
+        planets = ephem.planets
+        lx, ly = ephem.lookahead(steps, dt)
+        bx = np.empty((steps, len(planets) + 1))
+        by = np.empty((steps, len(planets) + 1))
+        bx[:, 0], by[:, 0] = cfg.CENTER
+        bx[:, 1:], by[:, 1:] = lx, ly
+        centers = np.stack([bx, by], axis=2)
+        gm = np.concatenate(([G * STAR_MASS], ephem.gm))[:, None]
+        radius = np.concatenate(([float(STAR_COLLISION_RADIUS)], ephem.radius))
+        radius2 = (radius ** 2)[:, None]
+        # what hitting each body means: the star only ends the path
+        hit_outcome = np.array([MISS] + [HIT_ENEMY if p.owner != site.owner else HIT_OWN
+                                         for p in planets], dtype=np.int8)
+
+        dirs = base + self.offsets
+        px, py = np.full(n, float(x)), np.full(n, float(y))
+        vx, vy = np.cos(dirs) * self.speeds, np.sin(dirs) * self.speeds
+        paths = np.zeros((n, steps + 1, 2))
+        paths[:, 0] = x, y
+        ends = np.full(n, steps + 1)
+        outcome = np.zeros(n, dtype=np.int8)
+        rows = np.arange(n)      # path behind each live column
+
+        for i in range(steps):
+            # semi-implicit Euler with (body, path) arrays: a fixed step whatever
+            # the match integrator, so a rebuild has a fixed cost
+            dx = bx[i, :, None] - px
+            dy = by[i, :, None] - py
+            r2 = dx * dx + dy * dy + SOFTENING
+            f = gm / (r2 * np.sqrt(r2))
+            vx += (f * dx).sum(axis=0) * dt
+            vy += (f * dy).sum(axis=0) * dt
+            sx, sy = vx * dt, vy * dt
+            px += sx
+            py += sy
+
+            # paths end at the first body this step's segment touches (swept,
+            # as in RocketSwarm: fast shots can't tunnel), or off-screen.
+            # Which pairs touch at all: the segment's closest approach to the
+            # body, p + u * s for u in [-1, 0], is within its radius.
+            ended = (px < -200) | (px > cfg.WIDTH + 200) | (py < -200) | (py > cfg.HEIGHT + 200)
+            dx = bx[i, :, None] - px
+            dy = by[i, :, None] - py
+            ss = sx * sx + sy * sy
+            w = dx * sx + dy * sy
+            u = np.minimum(np.maximum(w / (ss + 1e-12), -1.0), 0.0)
+            near = dx * dx + dy * dy - u * (2.0 * w - u * ss) <= radius2
+            if near.any():
+                bj, ri = np.nonzero(near)
+                seg = np.empty((len(rows), 2))
+                seg[:, 0], seg[:, 1] = sx, sy
+                p0 = np.empty((len(rows), 2))
+                p0[:, 0], p0[:, 1] = px - sx, py - sy
+                ri, bj, t = _first_contacts(p0, seg, centers[i], radius, ri, bj)
+                px[ri] = p0[ri, 0] + sx[ri] * t
+                py[ri] = p0[ri, 1] + sy[ri] * t
+                outcome[rows[ri]] = hit_outcome[bj]
+                ended[ri] = True
+            paths[rows, i + 1, 0] = px
+            paths[rows, i + 1, 1] = py
+            if ended.any():
+                # ended paths stop being integrated
+                ends[rows[ended]] = i + 2
+                live = ~ended
+                rows, px, py, vx, vy = rows[live], px[live], py[live], vx[live], vy[live]
+                if len(rows) == 0:
+                    break
+
+        # thin out for drawing: every stride-th step, then each path's end point
+        rows = np.arange(n)
+        kept = paths[:, ::self.stride]
+        full = (ends - 1) // self.stride + 1      # kept points before the end
+        thin = np.empty((n, kept.shape[1] + 1, 2))
+        thin[:, :-1] = kept
+        past = np.arange(thin.shape[1]) >= full[:, None]   # the end point and the unused tail
+        thin[past] = np.repeat(paths[rows, ends - 1], thin.shape[1] - full, axis=0)
+        self.paths, self.ends, self.outcome = thin, full + 1, outcome
+        self._origin = (x, y, base)
+        self._drawn = None
+
+    def follow(self, site):
+        """Carry the built fan along with the moving tower (rigid transform into
+        the current launch frame), without re-integrating it."""
+        x0, y0, a0 = self._origin
+        x1, y1, a1 = self._launch_frame(site)
+        if (x0, y0, a0) == (x1, y1, a1):
+            return
+        c, s = math.cos(a1 - a0), math.sin(a1 - a0)
+        rot = np.array([[c, s], [-s, c]])
+        self.paths = (self.paths - (x0, y0)) @ rot + (x1, y1)
+        self._origin = (x1, y1, a1)
+        self._drawn = None
+
+    def draw(self, surf, scale=1.0):
+        """Draw every path in its outcome colour, at `scale` times world
+        pixels; returns the touched rect."""
+        if self.paths is None:
+            return None
+        if self._drawn is None or self._drawn_scale != scale:
+            paths = self.paths if scale == 1.0 else self.paths * scale
+            self._drawn = [(FAN_COLORS[o], p[:e].astype(int).tolist()) for p, e, o in
+                           zip(paths, self.ends.tolist(), self.outcome.tolist()) if e >= 2]
+            self._drawn_scale = scale
+        dirty = None
+        for color, pts in self._drawn:
+            rect = pygame.draw.lines(surf, color, False, pts)
+            dirty = rect if dirty is None else dirty.union(rect)
+        return dirty
@@ -0,0 +1,108 @@
+"""Low-overhead timing scopes around the main stages of a frame and a tick.
+
+    from profiler import profiler
+    with profiler.scope("physics"):
+        ...
+
+While the profiler is disabled, scope() returns one shared do-nothing
+context manager, so instrumented code pays for a method call and a flag
+test. When it is enabled, each named scope keeps its last PROFILE_SAMPLES
+durations and net allocated-block counts (sys.getallocatedblocks(): blocks
+the scope left allocated, not every temporary) for rolling p50/p99. While a
+trace is recording, every scope also logs a Chrome trace event, and
+save_trace() writes them out as JSON for chrome://tracing or Perfetto.
+Scopes can be used from any thread (the sim worker's show up on their own
+trace track).
+"""
+import json, os, sys, threading, time
+from settings import PROFILE_SAMPLES, PROFILE_TRACE_EVENTS
+
+class _NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullScope()
+
+class Scope:
+    __slots__ = ("name", "profiler", "times", "allocs", "calls", "_t0", "_b0")
+
+    def __init__(self, name, profiler, samples):
+        self.name = name
+        self.profiler = profiler
+        self.times = [0] * samples     # ns, ring buffer
+        self.allocs = [0] * samples
+        self.calls = 0
+
+    def __enter__(self):
+        self._b0 = sys.getallocatedblocks()
+        self._t0 = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        t1 = time.perf_counter_ns()
+        blocks = sys.getallocatedblocks() - self._b0
+        i = self.calls % len(self.times)
+        self.times[i] = t1 - self._t0
+        self.allocs[i] = blocks
+        self.calls += 1
+        trace = self.profiler.trace
+        if trace is not None and len(trace) < PROFILE_TRACE_EVENTS:
+            trace.append((self.name, self._t0, t1 - self._t0, threading.get_ident(), blocks))
+        return False
+
+    def stats(self):
+        """(calls, p50 ms, p99 ms, mean net blocks allocated) over the window."""
+        n = min(self.calls, len(self.times))
+        if n == 0:
+            return 0, 0.0, 0.0, 0.0
+        t = sorted(self.times[:n])
+        return (self.calls, t[n // 2] / 1e6, t[min(n - 1, n * 99 // 100)] / 1e6,
+                sum(self.allocs[:n]) / n)
+
+class Profiler:
+    def __init__(self, samples=PROFILE_SAMPLES):
+        self.samples = samples
+        self.enabled = False
+        self.scopes = {}         # name -> Scope, in order of first use
+        self.trace = None        # recorded events while a trace is on
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL
+        s = self.scopes.get(name)
+        if s is None:
+            s = self.scopes[name] = Scope(name, self, self.samples)
+        return s
+
+    def stats(self):
+        """[(name, calls, p50 ms, p99 ms, mean allocs)] for every scope seen."""
+        return [(s.name, *s.stats()) for s in list(self.scopes.values())]
+
+    def reset(self):
+        self.scopes = {}
+
+    def start_trace(self):
+        self.trace = []
+        self.enabled = True
+
+    def save_trace(self, path):
+        """Stop recording and write the trace as Chrome trace-event JSON;
+        returns the number of events written."""
+        events, self.trace = self.trace or [], None
+        pid = os.getpid()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+               for tid, name in names.items()]
+        out += [{"name": name, "cat": "isac", "ph": "X", "ts": t0 / 1e3, "dur": dur / 1e3,
+                 "pid": pid, "tid": tid, "args": {"allocs": blocks}}
+                for name, t0, dur, tid, blocks in events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": out, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+profiler = Profiler()
@@ -0,0 +1,64 @@
+"""Frame-time governor: trade rendering quality for frame rate, in steps.
+
+The game reports how long each frame's work took (events, ticks, drawing;
+not time spent waiting). Every QUALITY_WINDOW frames the governor looks at
+the 90th percentile: over QUALITY_FRAME_BUDGET * QUALITY_DEGRADE_AT it
+switches on the next degradation step, under QUALITY_FRAME_BUDGET *
+QUALITY_RESTORE_AT it switches the last one back off. Steps are cumulative,
+in order:
+
+    resolution   the world is drawn at QUALITY_RENDER_SCALE of the display's
+                 resolution and stretched onto it; the HUD stays sharp
+    trails       rocket trails fade QUALITY_TRAIL_FADE times faster
+    sun          sun animation only advances every QUALITY_SUN_STRIDE ticks
+    preview      aim preview and fan integrate QUALITY_PREVIEW_SCALE of the steps
+
+A step that would be undone right after it was restored (the restore put
+the frame back over budget) makes the governor wait twice as long before it
+tries restoring again.
+"""
+from collections import deque
+from settings import QUALITY_FRAME_BUDGET, QUALITY_WINDOW, QUALITY_DEGRADE_AT, QUALITY_RESTORE_AT
+
+STEPS = ("resolution", "trails", "sun", "preview")
+
+class QualityGovernor:
+    def __init__(self, steps=STEPS, budget=QUALITY_FRAME_BUDGET, window=QUALITY_WINDOW):
+        self.steps = tuple(steps)     # the degradations available here, in order
+        self.level = 0                # how many of them are on
+        self.budget = budget
+        self.window = window
+        self.times = deque(maxlen=window)
+        self._wait = 1                # windows to skip before the next restore
+        self._skip = 0
+        self._restored = False        # the last change was a restore
+
+    def active(self, step):
+        return step in self.steps[:self.level]
+
+    def frame(self, seconds):
+        """Record one frame's work time; returns True when the level changed."""
+        times = self.times
+        times.append(seconds)
+        if len(times) < self.window:
+            return False
+        p90 = sorted(times)[self.window * 9 // 10]
+        times.clear()
+        if p90 > self.budget * QUALITY_DEGRADE_AT and self.level < len(self.steps):
+            if self._restored:
+                self._wait *= 2       # that restore didn't hold
+            self.level += 1
+            self._restored = False
+            self._skip = self._wait
+            return True
+        if p90 < self.budget * QUALITY_RESTORE_AT and self.level > 0:
+            if self._skip > 0:
+                self._skip -= 1
+                return False
+            self.level -= 1
+            self._restored = True
+            return True
+        if self.level == 0:
+            self._wait = 1
+        self._restored = False
+        return False
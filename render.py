@@ -0,0 +1,323 @@
+import math, time, pygame
+from collections import OrderedDict
+from settings import (SUN_CACHE_BUDGET, TRAIL_COLOR, TRAIL_FADE_INTERVAL, TRAIL_FADE_STEP,
+                      PROFILE_OVERLAY_REFRESH)
+from assets import fade_surface
+
+class SunCompositor:
+    """Faded/scaled star animation, built once at load time.
+
+    The two sun animations run in lock-step, so the composite repeats every
+    lcm(len(a), len(b)) frames. If that many pre-composited frames fit in
+    SUN_CACHE_BUDGET bytes they are all built up front; otherwise only the
+    faded per-animation frames are kept and composited into one persistent
+    scratch layer. Either way drawing allocates nothing and puts a single
+    additive blit on the target. At a render scale other than 1 the layers
+    are scaled once (per scale) and composited into a scratch layer of
+    their own.
+    """
+    def __init__(self, frames_a, frames_b, fade_a=0.2, fade_b=0.4, scale_b=0.8,
+                 core_color=(255, 223, 0), core_radius=30, budget=SUN_CACHE_BUDGET):
+        layers_a = [fade_surface(f, fade_a).convert_alpha() for f in frames_a]
+        layers_b = [pygame.transform.rotozoom(fade_surface(f, fade_b), 0, scale_b).convert_alpha()
+                    for f in frames_b]
+
+        w = max([core_radius * 2] + [s.get_width() for s in layers_a + layers_b])
+        h = max([core_radius * 2] + [s.get_height() for s in layers_a + layers_b])
+        self.size = (w, h)
+        core = pygame.Surface(self.size, pygame.SRCALPHA)
+        pygame.draw.circle(core, core_color, (w // 2, h // 2), core_radius)
+        self.layers = self._layer_set(core, layers_a, layers_b)
+        self._scaled = None        # layer set at _scaled_for
+        self._scaled_for = None
+
+        na, nb = len(layers_a), len(layers_b)
+        period = na * nb // math.gcd(na, nb)
+        self.composites = None
+        if period * w * h * 4 <= budget:
+            self.composites = {}
+            for t in range(period):
+                key = (t % na, t % nb)
+                self.composites[key] = self._compose(self.layers, *key).copy()
+
+    @staticmethod
+    def _layer_set(core, layers_a, layers_b):
+        """Core, both animations centred on it, and a scratch layer to compose in."""
+        w, h = core.get_size()
+        offsets = lambda layers: [((w - s.get_width()) // 2, (h - s.get_height()) // 2) for s in layers]
+        return (core, layers_a, offsets(layers_a), layers_b, offsets(layers_b),
+                pygame.Surface((w, h), pygame.SRCALPHA))
+
+    def _compose(self, layers, ia, ib):
+        core, layers_a, offsets_a, layers_b, offsets_b, scratch = layers
+        ia, ib = ia % len(layers_a), ib % len(layers_b)
+        scratch.fill((0, 0, 0, 0))
+        scratch.blit(core, (0, 0))
+        scratch.blit(layers_a[ia], offsets_a[ia])
+        scratch.blit(layers_b[ib], offsets_b[ib])
+        return scratch
+
+    def draw(self, surf, center, ia, ib, scale=1.0):
+        if scale != 1.0:
+            if scale != self._scaled_for:
+                core, layers_a, _, layers_b, _, _ = self.layers
+                by = lambda s: pygame.transform.smoothscale_by(s, scale)
+                self._scaled = self._layer_set(by(core), [by(s) for s in layers_a], [by(s) for s in layers_b])
+                self._scaled_for = scale
+            img = self._compose(self._scaled, ia, ib)
+        else:
+            img = None
+            if self.composites is not None:
+                img = self.composites.get((ia, ib))
+            if img is None:
+                img = self._compose(self.layers, ia, ib)
+        w, h = img.get_size()
+        return surf.blit(img, (center[0] - w // 2, center[1] - h // 2), special_flags=pygame.BLEND_RGBA_ADD)
+
+class StaticLayer:
+    """Background plus orbit circles, cached until invalidate() (planet removed).
+    `bg` is already sized for the target; `scale` maps world pixels onto it."""
+    def __init__(self, bg, scale=1.0):
+        self.bg = bg
+        self.scale = scale
+        self.surface = bg.copy()
+        self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
+
+    def ensure(self, planets, center):
+        """Rebuild if invalidated; returns True when the layer changed."""
+        if not self.dirty:
+            return False
+        self.surface.blit(self.bg, (0, 0))
+        s = self.scale
+        for p in planets:
+            pygame.draw.circle(self.surface, (255, 255, 255, 30), (int(center[0] * s), int(center[1] * s)),
+                               int(p.orbit_radius * s), 1)
+        self.dirty = False
+        return True
+
+class TextCache:
+    """font.render memo: HUD strings are only re-rendered when they change."""
+    def __init__(self, font, max_entries=256):
+        self.font = font
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+
+    def render(self, text, color):
+        key = (text, color)
+        img = self._cache.get(key)
+        if img is None:
+            img = self._cache[key] = self.font.render(text, True, color)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return img
+
+class DirtyRects:
+    """Per-frame dirty-rectangle bookkeeping over a StaticLayer.
+
+    Each frame: erase() restores the static layer under last frame's rects,
+    drawing code add()s every rect it touches, and present() pushes last
+    frame's plus this frame's rects to the display. force_full() falls back
+    to a whole-screen restore and flip for the next frame.
+    """
+    def __init__(self, screen):
+        self.screen = screen
+        self.bounds = screen.get_rect()
+        self.prev = []
+        self.cur = []
+        self.full = True
+
+    def force_full(self):
+        self.full = True
+
+    def erase(self, static):
+        if self.full:
+            self.screen.blit(static.surface, (0, 0))
+        else:
+            for rect in self.prev:
+                self.screen.blit(static.surface, rect, rect)
+
+    def add(self, rect):
+        if rect:
+            # pygame.draw's returned bounds can be a pixel short (AA edges, circles)
+            rect = self.bounds.clip(pygame.Rect(rect).inflate(4, 4))
+            if rect.w and rect.h:
+                self.cur.append(rect)
+
+    def swap(self):
+        """End the frame without presenting it: returns whether the whole
+        surface changed, and last frame's plus this frame's rects."""
+        full, rects = self.full, self.prev + self.cur
+        self.prev, self.cur = self.cur, []
+        self.full = False
+        return full, rects
+
+    def present(self):
+        full, rects = self.swap()
+        if full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+class Upscaler:
+    """Offscreen world surface at `scale` of the screen, stretched onto it.
+
+    The world is drawn into `surface` with its own DirtyRects; stretch()
+    then copies that frame's rects up onto the screen, together with what
+    the HUD covered last frame. The HUD is drawn straight onto the screen
+    at full resolution afterwards and add()s its rects here, so to the HUD
+    this stands in for DirtyRects: add(), force_full() and present().
+    """
+    def __init__(self, screen, scale):
+        self.screen = screen
+        self.bounds = screen.get_rect()
+        w, h = self.bounds.size
+        self.surface = pygame.Surface((max(1, round(w * scale)), max(1, round(h * scale)))).convert(screen)
+        self.world_bounds = self.surface.get_rect()
+        self.prev = []         # HUD rects, screen pixels
+        self.cur = []
+        self.shown = []        # screen rects stretched this frame
+        self.full = True
+
+    def force_full(self):
+        self.full = True
+
+    def add(self, rect):
+        if rect:
+            rect = self.bounds.clip(pygame.Rect(rect).inflate(4, 4))
+            if rect.w and rect.h:
+                self.cur.append(rect)
+
+    def _map(self, rect, src, dst):
+        """`rect` from src's pixels to the dst pixels it covers (rounded outwards)."""
+        sw, sh = src.size
+        dw, dh = dst.size
+        x0, y0 = rect.left * dw // sw, rect.top * dh // sh
+        x1, y1 = -(-rect.right * dw // sw), -(-rect.bottom * dh // sh)
+        return dst.clip(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+
+    def stretch(self, world_dirty):
+        """Copy the world's changes (a DirtyRects over `surface`) to the screen."""
+        full, rects = world_dirty.swap()
+        if full or self.full:
+            pygame.transform.scale(self.surface, self.bounds.size, self.screen)
+            self.full = True
+            return
+        rects += [self._map(r, self.bounds, self.world_bounds) for r in self.prev]
+        shown = []
+        for r in rects:
+            if not (r.w and r.h):
+                continue
+            dst = self._map(r, self.world_bounds, self.bounds)
+            pygame.transform.scale(self.surface.subsurface(r), dst.size, self.screen.subsurface(dst))
+            shown.append(dst)
+        self.shown = shown
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.shown + self.cur)
+        self.prev, self.cur = self.cur, []
+        self.shown = []
+        self.full = False
+
+class TrailLayer:
+    """Persistent SRCALPHA surface that rocket trails accumulate into.
+
+    Each frame only the segments recorded since the last frame are drawn;
+    every TRAIL_FADE_INTERVAL sim ticks the whole trail region loses
+    TRAIL_FADE_STEP alpha (one band per tick), so old trail fades out in bulk,
+    at the same rate whatever the frame rate, and the per-rocket cost doesn't
+    depend on trail length.
+    """
+    def __init__(self, size, scale=1.0):
+        self.surface = pygame.Surface(size, pygame.SRCALPHA)
+        self.scale = scale       # world pixels -> surface pixels
+        self.bounds = None       # region that may hold non-transparent pixels
+        self.tick = 0            # fade bands done so far, one per sim tick
+        self._due = 0            # sim ticks passed that haven't faded their band yet
+        self.fade_step = TRAIL_FADE_STEP
+        self._fades_left = 0     # fades until everything in bounds is gone
+        self._drawn = {}         # rocket uid -> trail points already drawn
+
+    def advance(self, ticks):
+        """Let `ticks` sim ticks of fading happen on the next update()."""
+        self._due += ticks
+
+    def update(self, swarm):
+        """Draw new trail segments of a RocketSwarm (or a worker.SwarmView)."""
+        surf = self.surface
+        drawn = {}
+        for i, r in enumerate(swarm.rockets):
+            # start at the last point already drawn so segments join up
+            pts = swarm.trail_points(i, self._drawn.get(r.uid, 0) - 1)
+            drawn[r.uid] = int(swarm.trail_count[i])
+            if len(pts) < 2:
+                continue
+            if self.scale != 1.0:
+                pts = (pts * self.scale).astype(int)
+            rect = pygame.draw.aalines(surf, TRAIL_COLOR, False, pts.tolist())
+            rect = rect.clip(surf.get_rect())
+            if rect.w and rect.h:
+                self.bounds = rect if self.bounds is None else self.bounds.union(rect)
+                self._fades_left = -(-TRAIL_COLOR[3] // self.fade_step)
+        self._drawn = drawn
+
+        # bulk fade, spread over the interval: each tick fades one horizontal
+        # band of the trail region, so every pixel loses fade_step once per interval
+        for _ in range(self._due):
+            if self.bounds is None:
+                break
+            band = self.tick % TRAIL_FADE_INTERVAL
+            b = self.bounds
+            y0 = b.top + b.height * band // TRAIL_FADE_INTERVAL
+            y1 = b.top + b.height * (band + 1) // TRAIL_FADE_INTERVAL
+            surf.fill((0, 0, 0, self.fade_step), (b.left, y0, b.width, y1 - y0),
+                      special_flags=pygame.BLEND_RGBA_SUB)
+            if band == TRAIL_FADE_INTERVAL - 1:
+                self._fades_left -= 1
+                if self._fades_left <= 0:
+                    self.bounds = None
+            self.tick += 1
+        self._due = 0
+
+    def draw(self, screen):
+        """Blit the live trail region; returns the touched rect (or None)."""
+        if self.bounds is None:
+            return None
+        return screen.blit(self.surface, self.bounds.topleft, self.bounds)
+
+class ProfileOverlay:
+    """Table of profiler.Profiler scopes, re-rendered at most every
+    PROFILE_OVERLAY_REFRESH seconds and blitted in between."""
+    def __init__(self, font, color=(240, 240, 240), bg=(0, 0, 0, 170)):
+        self.font = font
+        self.color = color
+        self.bg = bg
+        self.surface = None
+        self._next = 0.0
+
+    def _render(self, stats):
+        lines = [f"{'scope':<15}{'p50 ms':>8}{'p99 ms':>8}{'allocs':>8}"]
+        lines += [f"{name[:14]:<15}{p50:>8.2f}{p99:>8.2f}{allocs:>8.0f}"
+                  for name, calls, p50, p99, allocs in stats]
+        rows = [self.font.render(line, True, self.color) for line in lines]
+        h = self.font.get_linesize()
+        surf = pygame.Surface((max(r.get_width() for r in rows) + 16, h * len(rows) + 12),
+                              pygame.SRCALPHA)
+        surf.fill(self.bg)
+        for i, r in enumerate(rows):
+            surf.blit(r, (8, 6 + i * h))
+        return surf
+
+    def draw(self, screen, profiler, pos):
+        now = time.perf_counter()
+        if self.surface is None or now >= self._next:
+            self.surface = self._render(profiler.stats())
+            self._next = now + PROFILE_OVERLAY_REFRESH
+        return screen.blit(self.surface, pos)
@@ -0,0 +1,165 @@
+"""Compact binary match replays.
+
+A replay is the match seed, physics settings and screen size, every queue_shot() input stamped
+with the tick it was issued at, and a state snapshot every
+REPLAY_SNAPSHOT_INTERVAL ticks. Re-simulating the inputs reproduces the match
+bit-for-bit; snapshots let seek() jump close to any tick and only step the
+remainder, headless.
+
+Layout (little-endian): header, then tagged records until b"E".
+    header   4s magic, H version, Q seed, H width, H height, I snapshot interval,
+             B integrator (index into integrators.INTEGRATORS),
+             B gravity (index into gravity.GRAVITY_BACKENDS), d theta
+    b"S"     I tick, H site id, d angle offset, d speed
+    b"K"     I tick, d t_sim, d time_scale, B turn, B game over, b winner,
+             H planets, H queued, H rockets, then per item:
+               planet  H id, d theta, d spin, i health, i shots
+               queued  B player, H site id, d angle, d speed, d fire time
+               rocket  B player, d x, d y, d vx, d vy
+    b"E"     I final tick
+"""
+import struct
+import settings as cfg
+from settings import REPLAY_SNAPSHOT_INTERVAL
+from sim import Simulation
+from integrators import INTEGRATORS
+from gravity import GRAVITY_BACKENDS
+
+MAGIC = b"ISRP"
+VERSION = 3
+# v1/v2 files were recorded before rockets collided with the star and were
+# swept against planets: re-simulating them with today's physics diverges
+MIN_VERSION = 3
+
+_PREFIX = struct.Struct("<4sH")          # magic, version: the same in every version
+_HEADER = struct.Struct("<4sHQHHIBBd")
+_TAG = struct.Struct("<c")
+_SHOT = struct.Struct("<IHdd")
+_SNAP = struct.Struct("<IddBBbHHH")
+_PLANET = struct.Struct("<Hddii")
+_QUEUED = struct.Struct("<BHddd")
+_ROCKET = struct.Struct("<Bdddd")
+_END = struct.Struct("<I")
+
+def _pack_state(state):
+    tick, t_sim, time_scale, turn, over, winner, planets, queued, rockets = state
+    parts = [_SNAP.pack(tick, t_sim, time_scale, turn, over, winner,
+                        len(planets), len(queued), len(rockets))]
+    parts += [_PLANET.pack(*p) for p in planets]
+    parts += [_QUEUED.pack(*q) for q in queued]
+    parts += [_ROCKET.pack(*r) for r in rockets]
+    return b"".join(parts)
+
+def _unpack_state(buf, off):
+    tick, t_sim, time_scale, turn, over, winner, np_, nq, nr = _SNAP.unpack_from(buf, off)
+    off += _SNAP.size
+    planets, queued, rockets = [], [], []
+    for items, st, n in ((planets, _PLANET, np_), (queued, _QUEUED, nq), (rockets, _ROCKET, nr)):
+        for _ in range(n):
+            items.append(st.unpack_from(buf, off))
+            off += st.size
+    state = (tick, t_sim, time_scale, turn, bool(over), winner, planets, queued, rockets)
+    return state, off
+
+class ReplayRecorder:
+    """Attach to a Simulation (sim.recorder = rec) to record it; close() when done."""
+    def __init__(self, path, sim, interval=REPLAY_SNAPSHOT_INTERVAL):
+        self.f = open(path, "wb")
+        self.interval = interval
+        self.f.write(_HEADER.pack(MAGIC, VERSION, sim.seed, cfg.WIDTH, cfg.HEIGHT, interval,
+                                  INTEGRATORS.index(sim.integrator.name),
+                                  GRAVITY_BACKENDS.index(sim.gravity.name), sim.gravity.theta))
+        self.last_tick = sim.tick
+        sim.recorder = self
+
+    def on_shot(self, tick, site_id, angle_offset, speed):
+        self.f.write(b"S" + _SHOT.pack(tick, site_id, angle_offset, speed))
+
+    def on_tick(self, sim):
+        self.last_tick = sim.tick
+        if sim.tick % self.interval == 0:
+            self.f.write(b"K" + _pack_state(sim.get_state()))
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.f.write(b"E" + _END.pack(self.last_tick))
+        self.f.close()
+
+class Replay:
+    """A parsed replay file: seed, physics settings, screen size, inputs by
+    tick, snapshots by tick."""
+    def __init__(self, seed, size, interval, shots, snapshots, end_tick,
+                 integrator="euler", gravity="direct", theta=0.0):
+        self.seed = seed
+        self.integrator = integrator
+        self.gravity = gravity
+        self.theta = theta
+        self.size = size
+        self.interval = interval
+        self.shots = shots            # tick -> [(site id, angle offset, speed), ...]
+        self.snapshots = snapshots    # tick -> state tuple (see Simulation.get_state)
+        self.end_tick = end_tick
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            buf = f.read()
+        magic, version = _PREFIX.unpack_from(buf, 0)
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            raise ValueError(f"{path}: not a v1-v{VERSION} replay")
+        if version < MIN_VERSION:
+            raise ValueError(f"{path}: v{version} replays were recorded with older collision "
+                             f"physics and can't be played back (v{MIN_VERSION}+ only)")
+        seed, w, h, interval, integrator, gravity, theta = _HEADER.unpack_from(buf, 0)[2:]
+        integrator, gravity = INTEGRATORS[integrator], GRAVITY_BACKENDS[gravity]
+        off = _HEADER.size
+        shots, snapshots, end_tick = {}, {}, None
+        while off < len(buf):
+            tag, = _TAG.unpack_from(buf, off)
+            off += 1
+            if tag == b"S":
+                tick, site_id, ang, spd = _SHOT.unpack_from(buf, off)
+                off += _SHOT.size
+                shots.setdefault(tick, []).append((site_id, ang, spd))
+            elif tag == b"K":
+                state, off = _unpack_state(buf, off)
+                snapshots[state[0]] = state
+            elif tag == b"E":
+                end_tick, = _END.unpack_from(buf, off)
+                break
+            else:
+                raise ValueError(f"{path}: bad record tag {tag!r} at byte {off - 1}")
+        if end_tick is None:  # truncated (e.g. crashed mid-match): play what we have
+            end_tick = max(list(shots) + list(snapshots) + [0])
+        return cls(seed, (w, h), interval, shots, snapshots, end_tick, integrator, gravity, theta)
+
+class ReplayPlayer:
+    """Re-simulates a Replay headless; seek() starts from the nearest snapshot."""
+    def __init__(self, replay):
+        self.replay = replay
+
+    def apply_inputs(self, sim):
+        """Issue the inputs recorded at sim.tick (call before sim.step())."""
+        for site_id, ang, spd in self.replay.shots.get(sim.tick, ()):
+            sim.queue_shot(sim.sites[site_id], ang, spd)
+
+    def advance(self, sim, tick):
+        """Step `sim` up to `tick` (or the end of the replay) without rendering."""
+        tick = min(tick, self.replay.end_tick)
+        while sim.tick < tick:
+            self.apply_inputs(sim)
+            sim.step()
+            sim.events.clear()
+        return sim
+
+    def seek(self, tick):
+        """A fresh Simulation at `tick`, restored from the closest snapshot before it."""
+        # physics is evaluated around the recorded screen centre
+        cfg.set_screen_metrics(*self.replay.size)
+        sim = Simulation(seed=self.replay.seed, integrator=self.replay.integrator,
+                         gravity=self.replay.gravity, theta=self.replay.theta)
+        start = max((t for t in self.replay.snapshots if t <= tick), default=None)
+        if start is not None:
+            sim.set_state(self.replay.snapshots[start])
+        return self.advance(sim, tick)
@@ -0,0 +1,86 @@
+"""Time-ordered event queue.
+
+Events sit in a binary heap ordered by (time, insertion order), so popping
+what is due costs O(log n) per event and nothing for the ones still waiting.
+Events can be tagged with keys (e.g. ("planet", id), ("site", id)) and
+cancelled by key: cancelled events are only marked dead and are dropped
+when they reach the top of the heap, so cancelling never rescans or
+rebuilds the queue.
+"""
+import heapq, itertools
+
+class Event:
+    __slots__ = ("time", "seq", "kind", "payload", "keys", "alive")
+
+    def __init__(self, time, seq, kind, payload, keys):
+        self.time = time
+        self.seq = seq
+        self.kind = kind
+        self.payload = payload
+        self.keys = keys
+        self.alive = True
+
+    def __lt__(self, other):
+        return (self.time, self.seq) < (other.time, other.seq)
+
+class Scheduler:
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._by_key = {}      # key -> events carrying it (may include dead ones)
+        self._counts = {}      # kind -> live events of that kind
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+    def count(self, kind):
+        return self._counts.get(kind, 0)
+
+    def schedule(self, time, kind, payload=None, keys=()):
+        """Queue `payload` to come due at `time`; returns the Event."""
+        ev = Event(time, next(self._seq), kind, payload, keys)
+        heapq.heappush(self._heap, ev)
+        for key in keys:
+            self._by_key.setdefault(key, []).append(ev)
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        return ev
+
+    def cancel(self, ev):
+        if ev.alive:
+            ev.alive = False
+            self._counts[ev.kind] -= 1
+
+    def cancel_key(self, key):
+        """Cancel every pending event tagged with `key`."""
+        for ev in self._by_key.pop(key, ()):
+            self.cancel(ev)
+
+    def _forget(self, ev):
+        for key in ev.keys:
+            events = self._by_key.get(key)
+            if events is not None and ev in events:
+                events.remove(ev)
+                if not events:
+                    del self._by_key[key]
+
+    def pop_due(self, now):
+        """Remove and return the live events with time <= now, in order."""
+        due = []
+        heap = self._heap
+        while heap and heap[0].time <= now:
+            ev = heapq.heappop(heap)
+            self._forget(ev)
+            if ev.alive:
+                self.cancel(ev)
+                due.append(ev)
+        return due
+
+    def pending(self, kind=None):
+        """Live events (of `kind`, if given) in the order they will come due."""
+        return [ev for ev in sorted(self._heap)
+                if ev.alive and (kind is None or ev.kind == kind)]
+
+    def clear(self):
+        self._heap.clear()
+        self._by_key.clear()
+        self._counts.clear()
@@ -0,0 +1,51 @@
+"""Per-player running totals, kept current as the match changes.
+
+Every change that affects a total goes through add(): planets report damage
+from take_damage(), and the Simulation reports shots fired, rockets launched
+and lost, and planets removed. Score, shots-left, game-over and HUD checks
+then read a Tally instead of rescanning every planet.
+"""
+
+class Tally:
+    __slots__ = ("health", "shots", "planets", "rockets")
+
+    def __init__(self, health=0, shots=0, planets=0, rockets=0):
+        self.health = health
+        self.shots = shots
+        self.planets = planets
+        self.rockets = rockets
+
+    def copy(self):
+        return Tally(self.health, self.shots, self.planets, self.rockets)
+
+class Scoreboard:
+    """Tally per player name (planet/site owners are player names)."""
+    def __init__(self, names):
+        self.tallies = {name: Tally() for name in names}
+
+    def __getitem__(self, name):
+        return self.tallies[name]
+
+    def add(self, name, health=0, shots=0, planets=0, rockets=0):
+        t = self.tallies[name]
+        t.health += health
+        t.shots += shots
+        t.planets += planets
+        t.rockets += rockets
+
+    def rebuild(self, planets, rockets):
+        """Recount from scratch (new match, restored state)."""
+        for t in self.tallies.values():
+            t.health = t.shots = t.planets = t.rockets = 0
+        for p in planets:
+            self.add(p.owner, health=p.health, shots=p.shots, planets=1)
+        for r in rockets:
+            self.add(r.owner.name, rockets=1)
+
+    def total(self, field):
+        return sum(getattr(t, field) for t in self.tallies.values())
+
+    def copy(self):
+        board = Scoreboard(())
+        board.tallies = {name: t.copy() for name, t in self.tallies.items()}
+        return board
@@ -3,27 +3,88 @@ import os, math
 # Paths
 ASSET_DIR = os.path.join(os.path.dirname(__file__), "isac_assets")
 SOUND_DIR = os.path.join(os.path.dirname(__file__), "sounds")
+# decoded pixels and PCM, memory-mapped on later launches (see assets.py); None disables it
+ASSET_CACHE_DIR = os.path.join(os.path.dirname(__file__), ".asset_cache")
 
 # Timing
 DT = 1/60.0
+SIM_STEP = DT          # real seconds per fixed simulation tick (each advances DT * time_scale)
+MAX_FRAME_TIME = 0.25  # clamp on a single frame's real time so a stall can't snowball
+RENDER_FPS_CAP = None  # None = display refresh rate (60 if unknown), 0 = uncapped; ticks stay at 1/SIM_STEP per second
+SNAPSHOT_TRAIL_POINTS = 16  # newest trail points per rocket in threaded-mode snapshots
 DEFAULT_TIME_SCALE = 0.5
 ACTION_TIME_SCALE  = 0.35
 PREVIEW_DT_SCALE   = 0.75
+PREVIEW_STEPS        = 80
+PREVIEW_REBUILD_TIME = 0.5   # sim seconds before a clean aim fan is rebuilt anyway
+FAN_ANGLES, FAN_SPEEDS = 16, 8   # aim-assist fan: 128 paths over the whole aim envelope
+FAN_STRIDE = 4                   # fan paths keep every n-th preview step for drawing
 
 # Physics (gameplay-tuned)
 G = 1500.0
 STAR_MASS = 4.0e3
 STAR_COLLISION_RADIUS = 40
+PLANET_MASS = 1200             # scaled per planet type in Simulation.create_planets
+ROCKET_DAMAGE = 34
+INTEGRATOR = "euler"          # euler | leapfrog | adaptive (see integrators.py)
+ADAPTIVE_ETA = 0.05           # adaptive substep, as a fraction of the local time scale
+ADAPTIVE_MAX_SUBSTEPS = 16
+GRAVITY = "direct"            # direct | barnes-hut (see gravity.py)
+BH_THETA = 0.5                # Barnes-Hut opening angle: larger is faster, less exact
+BH_MAX_DEPTH = 16
 
 # Controls
 ANGLE_LIMIT_DEG = 20
 MIN_SPEED, MAX_SPEED = 120.0, 520.0
 
+# Computer opponent (see ai.py)
+AI_THINK_BUDGET = 0.05        # seconds of search per shot
+AI_FRAME_BUDGET = 0.004       # seconds of search per rendered frame
+AI_LEAD = 0.5                 # sim seconds from starting to think to firing
+AI_STEPS = 140                # flight steps scored per candidate shot (~2.3 sim s)
+AI_DT_SCALE = 3               # each flight step is this many action-speed ticks
+AI_COARSE_ANGLES, AI_COARSE_SPEEDS = 24, 16  # first-round grid per launch site
+AI_KEEP = 32                  # best candidates refined each later round
+AI_ROUNDS = 6
+
+# Profiling (see profiler.py; P toggles the overlay, T starts/saves a trace)
+PROFILE_SAMPLES = 240           # rolling window per scope (4 s at 60 FPS)
+PROFILE_TRACE_EVENTS = 500_000  # a trace stops growing past this many events
+PROFILE_OVERLAY_REFRESH = 0.5   # seconds between overlay re-renders
+PROFILE_TRACE_FILE = "trace.json"
+
+# Quality governor (see quality.py)
+QUALITY_GOVERNOR = True
+QUALITY_FRAME_BUDGET = 1 / 60   # seconds of work per frame to stay within
+QUALITY_WINDOW = 60             # frames per decision (p90 of their work time)
+QUALITY_DEGRADE_AT = 1.0        # step down when p90 > budget * this
+QUALITY_RESTORE_AT = 0.5        # step back up when p90 < budget * this
+QUALITY_RENDER_SCALE = 0.5      # world resolution at the "resolution" step (stretched to the screen)
+QUALITY_TRAIL_FADE = 3          # trails fade this many times faster at the "trails" step
+QUALITY_SUN_STRIDE = 3          # sun animation advances every n-th tick at the "sun" step
+QUALITY_PREVIEW_SCALE = 0.5     # fraction of PREVIEW_STEPS at the "preview" step
+
+# Render caches
+SUN_CACHE_BUDGET = 32 * 1024 * 1024   # bytes of pre-composited sun frames
+IMAGE_CACHE_BYTES = 32 * 1024 * 1024  # unreferenced images are evicted past this
+FRAME_SCALE_STEP = 1 / 64               # explosion frame sets are cached per scale step
+ROTATION_BUCKETS = 720                 # 0.5 degree steps for rotated sprites
+ROTATION_CACHE_BYTES = 64 * 1024 * 1024
+TOWER_SPRITE, TOWER_SCALE = "tower2.png", 1.0
+ROCKET_SCALE = 0.9
+
+# Rocket trails
+TRAIL_LENGTH = 800                  # ring-buffer points kept per rocket
+TRAIL_COLOR = (255, 255, 255, 255)
+TRAIL_FADE_INTERVAL = 12            # sim ticks between bulk fades of the trail layer
+TRAIL_FADE_STEP = 4                 # alpha removed per fade (~13 s trail at 60 ticks/s)
+
 # Colors
 WHITE  = (240,240,240)
 YELLOW = (255,220, 90)
 GREEN  = (60, 220, 120)
 RED    = (235, 70, 70)
+FAN_COLORS = ((80, 80, 110), (60, 170, 100), (170, 60, 60))   # miss, enemy hit, own hit
 
 # Screen metrics – set at runtime by game.py after pygame.init()
 WIDTH, HEIGHT = 1280, 720
@@ -34,6 +95,10 @@ def set_screen_metrics(w: int, h: int):
     WIDTH, HEIGHT = w, h
     CENTER = (WIDTH // 2, HEIGHT // 2)
 
+# Replays
+REPLAY_SNAPSHOT_INTERVAL = 600      # ticks between state snapshots (seek granularity)
+REPLAY_SEEK_TICKS = 300             # LEFT/RIGHT in replay mode
+
 #shots per planet
 SHOTS_PER_PLANET = 10
 
@@ -0,0 +1,276 @@
+import math, random
+from settings import DT, DEFAULT_TIME_SCALE, ACTION_TIME_SCALE, PLANET_MASS, INTEGRATOR, GRAVITY, BH_THETA
+from entities import Planet, Rocket
+from physics import RocketSwarm
+from ephemeris import Ephemeris
+from integrators import get_integrator
+from gravity import get_gravity
+from scheduler import Scheduler
+from scoreboard import Scoreboard
+from profiler import profiler
+
+class Player:
+    def __init__(self, name, color):
+        self.name = name
+        self.color = color
+        self.alive = True
+
+class Simulation:
+    """Game state and rules with no rendering dependency.
+
+    Owns planets, rockets, queued shots, damage, turns and game over. Nothing
+    here touches the display, fonts, mixer or image files, so step() can be
+    driven headless as fast as the CPU allows. Things a front end may want to
+    react to are appended to `events` as tuples:
+        ("planet_destroyed", planet, (x, y))
+        ("rocket_dead", rocket)
+        ("turn_skipped", player)
+
+    All randomness comes from `seed` and all state is in get_state(), so a
+    match is reproduced bit-for-bit by replaying its queue_shot() calls at the
+    same ticks with the same `integrator` and `gravity` (see replay.py).
+    """
+    def __init__(self, players=None, seed=None, integrator=INTEGRATOR, gravity=GRAVITY, theta=BH_THETA):
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        # part of the match, like the seed
+        self.integrator = get_integrator(integrator)
+        self.gravity = get_gravity(gravity, theta)
+        self.rng = random.Random(self.seed)
+        self.tick = 0
+        self.recorder = None   # replay.ReplayRecorder, if this match is recorded
+
+        # players & turn
+        self.players = players or [Player("Blue", (120,200,255)), Player("Red", (255,120,120))]
+        self.player_named = {pl.name: pl for pl in self.players}
+        self.turn_index = 0
+
+        # planets (ids index all_planets/sites and stay stable after removals)
+        self.planets = self.create_planets()
+        self.all_planets = tuple(self.planets)
+        self.sites = []
+        for i, p in enumerate(self.planets):
+            p.id = i
+            for site in p.sites:
+                site.owner = p.owner
+                site.id = len(self.sites)
+                self.sites.append(site)
+
+        # planet positions/spins for this tick, as arrays
+        self.ephemeris = Ephemeris(self.planets)
+
+        # running per-player health / shots / planets / rockets
+        self.scoreboard = Scoreboard(self.player_named)
+        for p in self.planets:
+            p.scoreboard = self.scoreboard
+
+        # state
+        self.rockets = RocketSwarm(integrator=self.integrator, gravity=self.gravity)   # live rockets only; dead ones are compacted away
+        # timed events; "shot" payloads are (player, site, angle_offset, speed),
+        # keyed by ("planet", id) and ("site", id) so a dead planet's shots are cancelled
+        self.scheduler = Scheduler()
+        self.t_sim = 0.0
+        self.time_scale = DEFAULT_TIME_SCALE
+        self.events = []
+        self.scoreboard.rebuild(self.planets, self.rockets)
+
+        # winner tracking
+        self.game_over = False
+        self.winner = None   # Player instance or None on tie
+
+    def create_planets(self):
+        sprites = [
+        ("BlueIce.png", 50, 0.8, "Blue"),
+        ("RedLava.png", 60, 0.7, "Red"),
+        ("BlueGas.png", 70, 1.0, "Blue"),
+        ("RedGas.png", 80, 0.9, "Red"),
+        #("RedVoid.png", 64, 0.8),
+        ]
+        planets = []
+        for i, (name, px_size, mass_scale, owner) in enumerate(sprites):
+            orbit_radius = 100 + i*80 + (self.rng.random() * 50 - 25)
+            orbit_period = 3 + (self.rng.random() * 50) + (i * 5)
+            radius_px = px_size//2
+            mass = PLANET_MASS * mass_scale
+            initial_angle = i * (math.tau/len(sprites))
+            spin_period = 6+(self.rng.random()*4-2)
+            num_sites = self.rng.choice([1,2])
+            # sprite is resolved by the renderer on first draw
+            p = Planet(name, None, orbit_radius * 1.0, orbit_period, radius_px, mass,
+                       initial_angle, spin_period, num_sites=num_sites, owner=owner)
+            planets.append(p)
+        return planets
+
+    def _scores(self):
+        board = self.scoreboard
+        return board["Blue"].health, board["Red"].health
+
+    def _shots_left(self):
+        board = self.scoreboard
+        return board["Blue"].shots, board["Red"].shots
+
+    def _check_game_over(self):
+        board = self.scoreboard
+        # --- planet wipeout first ---
+        blue_gone = board["Blue"].planets == 0
+        red_gone  = board["Red"].planets == 0
+
+        if blue_gone and red_gone:
+            self.winner = None  # total annihilation -> draw
+            self.game_over = True
+            return
+        if blue_gone:
+            self.winner = self.player_named["Red"]
+            self.game_over = True
+            return
+        if red_gone:
+            self.winner = self.player_named["Blue"]
+            self.game_over = True
+            return
+
+        # --- otherwise, only end when neither side can shoot and nothing is pending ---
+        blue_shots, red_shots = self._shots_left()
+        rockets_alive = board.total("rockets") > 0
+        nothing_pending = (not rockets_alive) and self.scheduler.count("shot") == 0
+
+        if blue_shots == 0 and red_shots == 0 and nothing_pending:
+            blue_score, red_score = self._scores()
+            if blue_score > red_score:
+                self.winner = self.player_named["Blue"]
+            elif red_score > blue_score:
+                self.winner = self.player_named["Red"]
+            else:
+                self.winner = None  # tie
+            self.game_over = True
+
+    @property
+    def queued_shots(self):
+        """Pending shots as (player, site, angle_offset, speed, fire_time) tuples."""
+        return [ev.payload + (ev.time,) for ev in self.scheduler.pending("shot")]
+
+    @property
+    def queued_shot_count(self):
+        return self.scheduler.count("shot")
+
+    def _schedule_shot(self, player, site, angle_offset, speed, fire_time):
+        self.scheduler.schedule(fire_time, "shot", (player, site, angle_offset, speed),
+                                keys=(("planet", site.planet.id), ("site", site.id)))
+
+    def current_player(self):
+        return self.players[self.turn_index % len(self.players)]
+
+    def cycle_turn(self):
+        self.turn_index = (self.turn_index + 1) % len(self.players)
+
+    def queue_shot(self, site, angle_offset=None, speed=None):
+        """Queue the current player's shot from `site` (aim defaults to the site's
+        planned aim) and pass the turn. Returns False (nothing queued) if the
+        planet is out of shots."""
+        if site.planet.shots < 1:
+            return False
+        if angle_offset is None:
+            angle_offset = site.planned_angle_offset
+        if speed is None:
+            speed = site.planned_speed
+        if self.recorder:
+            self.recorder.on_shot(self.tick, site.id, angle_offset, speed)
+        self._schedule_shot(self.current_player(), site, angle_offset, speed, self.t_sim)
+        self.cycle_turn()
+        return True
+
+    def spawn_rocket(self, player, site, angle_offset, speed):
+        (x,y), tower_ang = site.get_world_pos()
+        base = tower_ang - math.pi/2
+        direction = base + angle_offset
+        vx = math.cos(direction) * speed
+        vy = math.sin(direction) * speed
+        self.rockets.add(Rocket(player, (x,y), (vx,vy)))
+        self.scoreboard.add(player.name, rockets=1)
+
+    def drain_events(self):
+        events, self.events = self.events, []
+        return events
+
+    def step(self):
+        """Advance the world by one tick; returns the sim-time dt that was used."""
+        self.time_scale = ACTION_TIME_SCALE if len(self.rockets) > 0 else DEFAULT_TIME_SCALE
+        dt = DT * self.time_scale
+        self.t_sim += dt
+
+        # --- auto-skip if current player cannot shoot ---
+        if not self.game_over:
+            cp = self.current_player().name
+            cp_shots  = self.scoreboard[cp].shots
+            opp_shots = self.scoreboard.total("shots") - cp_shots
+            nothing_pending = (len(self.rockets) == 0) and self.scheduler.count("shot") == 0
+            if cp_shots == 0 and opp_shots > 0 and nothing_pending:
+                self.cycle_turn()
+                self.events.append(("turn_skipped", self.current_player()))
+
+        # planets move (one vectorised step for all of them)
+        self.ephemeris.advance(dt)
+
+        # fire queued shots that are due (a destroyed planet's were cancelled)
+        for ev in self.scheduler.pop_due(self.t_sim):
+            player, site, ang_off, speed = ev.payload
+            if site.planet.shots > 0:
+                site.planet.shots -= 1
+                self.scoreboard.add(site.planet.owner, shots=-1)
+                self.spawn_rocket(player, site, ang_off, speed)
+
+        # rockets (one batched gravity/collision step for the whole swarm)
+        with profiler.scope("physics"):
+            for r in self.rockets.step(self.ephemeris, dt):
+                self.scoreboard.add(r.owner.name, rockets=-1)
+                self.events.append(("rocket_dead", r))
+
+        # --- destroyed planets: report them, then remove them from the game ---
+        with profiler.scope("planet_removal"):
+            removed = [p for p in self.planets if p.health <= 0]
+            if removed:
+                removed_set = set(removed)
+                for p in removed:
+                    self.scoreboard.add(p.owner, health=-p.health, shots=-p.shots, planets=-1)
+                    self.events.append(("planet_destroyed", p, p.pos))
+                self.planets = [p for p in self.planets if p not in removed_set]
+                self.ephemeris.set_planets(self.planets)
+                for p in removed:
+                    self.scheduler.cancel_key(("planet", p.id))
+
+        self._check_game_over()
+        self.tick += 1
+        if self.recorder:
+            self.recorder.on_tick(self)
+        return dt
+
+    def get_state(self):
+        """Everything step() depends on, as plain numbers/tuples (ids, not objects)."""
+        players = self.players
+        return (
+            self.tick, self.t_sim, self.time_scale, self.turn_index, self.game_over,
+            players.index(self.winner) if self.winner else -1,
+            [(p.id, p.theta, p.spin, p.health, p.shots) for p in self.planets],
+            [(players.index(pl), site.id, ang, spd, t) for pl, site, ang, spd, t in self.queued_shots],
+            [(players.index(r.owner), float(r.pos[0]), float(r.pos[1]), float(r.vel[0]), float(r.vel[1]))
+             for r in self.rockets],
+        )
+
+    def set_state(self, state):
+        """Restore a get_state() tuple onto a Simulation created with the same seed."""
+        (self.tick, self.t_sim, self.time_scale, self.turn_index, self.game_over,
+         winner, planets, queued, rockets) = state
+        self.winner = self.players[winner] if winner >= 0 else None
+        self.planets = []
+        for pid, theta, spin, health, shots in planets:
+            p = self.all_planets[pid]
+            p.theta, p.spin, p.health, p.shots = theta, spin, health, shots
+            p.prev_theta, p.prev_spin = theta, spin
+            self.planets.append(p)
+        self.ephemeris.set_planets(self.planets)
+        self.scheduler.clear()
+        for pl, sid, ang, spd, t in queued:
+            self._schedule_shot(self.players[pl], self.sites[sid], ang, spd, t)
+        self.rockets = RocketSwarm(integrator=self.integrator, gravity=self.gravity)
+        for pl, x, y, vx, vy in rockets:
+            self.rockets.add(Rocket(self.players[pl], (x, y), (vx, vy)))
+        self.scoreboard.rebuild(self.planets, self.rockets)
+        self.events = []
@@ -0,0 +1,231 @@
+"""Headless batch matches: win rates, match lengths and sim speed.
+
+Plays `--matches` seeded matches with no window or sound (SDL dummy
+drivers) across a process pool. Each side is driven by a shot policy
+(see POLICIES; "search" is the ai.SearchAI opponent) that picks a launch
+site, angle offset and speed once it has had the turn for `--think` ticks.
+Settings can be overridden per run for balancing, e.g.
+
+    python tournament.py --matches 2000 --blue aim --red random \\
+        --set SHOTS_PER_PLANET=6 --set ROCKET_DAMAGE=25 --set PLANET_MASS=1500
+
+Overrides are applied in every worker before the simulation modules are
+imported, so constants read with `from settings import ...` see them too;
+integrators.py and gravity.py (imported here for the option choices) read
+theirs when a match builds its integrator and gravity backend.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse, ast, math, random, statistics, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import settings as cfg
+
+THINK_TICKS = 30          # ticks a policy holds the turn before it shoots
+MAX_TICKS = 60 * 60 * 2   # matches still running after this are called a timeout
+
+
+def _stalled(sim):
+    """True once the player to move has no shots, none are queued and every
+    live rocket has left the playfield: the sim neither passes the turn nor
+    calls the game while a rocket is alive, so an escaped one would hold the
+    match open until max_ticks."""
+    n = len(sim.rockets)
+    if n == 0 or sim.queued_shot_count or sim.scoreboard[sim.current_player().name].shots:
+        return False
+    x, y = sim.rockets.pos[:n].T
+    return bool(((x < 0) | (x > cfg.WIDTH) | (y < 0) | (y > cfg.HEIGHT)).all())
+
+def _winner_by_health(sim):
+    """The side with more planet health left, as the sim decides a game that
+    ran out of shots; None on a tie."""
+    blue, red = sim._scores()
+    if blue == red:
+        return None
+    return "Blue" if blue > red else "Red"
+
+def _own_sites(sim, player):
+    return [s for p in sim.planets if p.owner == player.name and p.shots > 0 for s in p.sites]
+
+class RandomPolicy:
+    """Any loaded site, any angle and speed the controls allow."""
+    name = "random"
+
+    def choose(self, sim, player, rng):
+        sites = _own_sites(sim, player)
+        if not sites:
+            return None
+        limit = math.radians(cfg.ANGLE_LIMIT_DEG)
+        return rng.choice(sites), rng.uniform(-limit, limit), rng.uniform(cfg.MIN_SPEED, cfg.MAX_SPEED)
+
+class AimPolicy:
+    """Scripted: each loaded site in turn points as close as it can at the
+    nearest enemy planet, with speed growing with distance."""
+    name = "aim"
+
+    def __init__(self):
+        self.shots = 0
+
+    def choose(self, sim, player, rng):
+        sites = _own_sites(sim, player)
+        enemies = [p for p in sim.planets if p.owner != player.name]
+        if not sites or not enemies:
+            return None
+        site = sites[self.shots % len(sites)]
+        self.shots += 1
+        (x, y), tower_ang = site.get_world_pos()
+        tx, ty = min((p.pos for p in enemies), key=lambda q: (q[0] - x) ** 2 + (q[1] - y) ** 2)
+        limit = math.radians(cfg.ANGLE_LIMIT_DEG)
+        off = (math.atan2(ty - y, tx - x) - (tower_ang - math.pi / 2) + math.pi) % math.tau - math.pi
+        speed = min(max(1.2 * math.hypot(tx - x, ty - y), cfg.MIN_SPEED), cfg.MAX_SPEED)
+        return site, max(-limit, min(limit, off)), speed
+
+def _search_policy():
+    from ai import SearchAI      # after apply_overrides(), like the sim modules
+    return SearchAI()
+
+POLICIES = {"random": RandomPolicy, "aim": AimPolicy, "search": _search_policy}
+
+def get_policy(name):
+    """A fresh shot policy by name (one of POLICIES)."""
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy {name!r} (expected one of {', '.join(POLICIES)})")
+    return POLICIES[name]()
+
+def apply_overrides(overrides):
+    """Set settings constants from a {NAME: value} dict."""
+    for name, value in overrides.items():
+        if not hasattr(cfg, name):
+            raise ValueError(f"settings has no {name}")
+        setattr(cfg, name, value)
+
+def parse_override(text):
+    name, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass                                   # plain strings, e.g. INTEGRATOR=leapfrog
+    return name.strip(), value
+
+def play_match(seed, blue="random", red="random", integrator=None, gravity=None, theta=None,
+               think=THINK_TICKS, max_ticks=MAX_TICKS):
+    """Play one match to the end; returns a result dict. A match that stalls
+    on escaped rockets (see _stalled) or is still running at `max_ticks` is
+    stopped there and goes to the side with more health left."""
+    from sim import Simulation
+    sim = Simulation(seed=seed,
+                     integrator=integrator or cfg.INTEGRATOR,
+                     gravity=gravity or cfg.GRAVITY,
+                     theta=cfg.BH_THETA if theta is None else theta)
+    policies = {"Blue": get_policy(blue), "Red": get_policy(red)}
+    rng = random.Random(seed ^ 0x5EED)        # policy choices don't disturb the sim's rng
+    turn, ready, shots, stalled = None, 0, 0, False
+
+    t0 = time.perf_counter()
+    while not sim.game_over and sim.tick < max_ticks:
+        if sim.turn_index != turn:
+            turn, ready = sim.turn_index, sim.tick + think
+        if sim.tick >= ready:
+            player = sim.current_player()
+            choice = policies[player.name].choose(sim, player, rng)
+            if choice and sim.queue_shot(*choice):
+                shots += 1
+            else:
+                ready = sim.tick + think
+        sim.step()
+        sim.events.clear()
+        if _stalled(sim):
+            stalled = True
+            break
+    seconds = time.perf_counter() - t0
+
+    blue_score, red_score = sim._scores()
+    return {
+        "seed": seed,
+        "winner": (sim.winner.name if sim.winner else None) if sim.game_over else _winner_by_health(sim),
+        "stalled": stalled,
+        "timeout": not sim.game_over and not stalled,
+        "ticks": sim.tick,
+        "t_sim": sim.t_sim,
+        "seconds": seconds,
+        "shots": shots,
+        "score": (blue_score, red_score),
+    }
+
+def _init_worker(overrides):
+    apply_overrides(overrides)
+
+def run(matches, seed=0, workers=None, overrides=None, **match_args):
+    """Play `matches` matches with seeds seed, seed+1, ...; returns
+    (results in seed order, wall seconds)."""
+    overrides = overrides or {}
+    apply_overrides(overrides)
+    play = partial(play_match, **match_args)
+    seeds = range(seed, seed + matches)
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, matches // (4 * workers))
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(overrides,)) as pool:
+        results = list(pool.map(play, seeds, chunksize=chunk))
+    return results, time.perf_counter() - t0
+
+def summarize(results, wall):
+    n = len(results)
+    ticks = [r["ticks"] for r in results]
+    t_sim = [r["t_sim"] for r in results]
+    return {
+        "matches": n,
+        "blue": sum(r["winner"] == "Blue" for r in results) / n,
+        "red": sum(r["winner"] == "Red" for r in results) / n,
+        "draw": sum(r["winner"] is None for r in results) / n,
+        "stalled": sum(r["stalled"] for r in results) / n,
+        "timeout": sum(r["timeout"] for r in results) / n,
+        "ticks_mean": statistics.fmean(ticks),
+        "ticks_median": statistics.median(ticks),
+        "ticks_max": max(ticks),
+        "t_sim_mean": statistics.fmean(t_sim),
+        "shots_mean": statistics.fmean(r["shots"] for r in results),
+        "tps_match": sum(ticks) / sum(r["seconds"] for r in results),
+        "tps_total": sum(ticks) / wall,
+        "wall": wall,
+    }
+
+if __name__ == "__main__":
+    from integrators import INTEGRATORS
+    from gravity import GRAVITY_BACKENDS
+
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--matches", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0, help="seed of the first match")
+    ap.add_argument("--workers", type=int, help="processes (default: one per CPU)")
+    ap.add_argument("--blue", choices=POLICIES, default="random", help="Blue's shot policy")
+    ap.add_argument("--red", choices=POLICIES, default="random", help="Red's shot policy")
+    ap.add_argument("--think", type=int, default=THINK_TICKS, help="ticks before a policy shoots")
+    ap.add_argument("--max-ticks", type=int, default=MAX_TICKS)
+    # defaults are left to play_match, so they come from settings after --set
+    ap.add_argument("--integrator", choices=INTEGRATORS, help="default: settings INTEGRATOR")
+    ap.add_argument("--gravity", choices=GRAVITY_BACKENDS, help="default: settings GRAVITY")
+    ap.add_argument("--theta", type=float, help="default: settings BH_THETA")
+    ap.add_argument("--set", type=parse_override, action="append", default=[], metavar="NAME=VALUE",
+                    help="override a settings constant (repeatable)")
+    args = ap.parse_args()
+
+    results, wall = run(args.matches, args.seed, args.workers, dict(args.set),
+                        blue=args.blue, red=args.red, integrator=args.integrator,
+                        gravity=args.gravity, theta=args.theta,
+                        think=args.think, max_ticks=args.max_ticks)
+    s = summarize(results, wall)
+    print(f"{s['matches']} matches, {args.blue} (Blue) vs {args.red} (Red)"
+          + "".join(f", {k}={v!r}" for k, v in args.set))
+    print(f"  wins     Blue {s['blue']:6.1%}  Red {s['red']:6.1%}  "
+          f"draw {s['draw']:6.1%}")
+    print(f"  decided  on health: stalled {s['stalled']:6.1%}  timeout {s['timeout']:6.1%}")
+    print(f"  length   mean {s['ticks_mean']:.0f}  median {s['ticks_median']:.0f}  "
+          f"max {s['ticks_max']} ticks ({s['t_sim_mean']:.1f} sim s mean), "
+          f"{s['shots_mean']:.1f} shots")
+    print(f"  speed    {s['tps_match']:.0f} ticks/s per match, "
+          f"{s['tps_total']:.0f} ticks/s overall, {s['wall']:.1f} s wall")
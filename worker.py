@@ -0,0 +1,166 @@
+"""Simulation on a background thread, for Game(threaded=True).
+
+The worker owns the live Simulation: it applies queued inputs, steps one tick
+every SIM_STEP seconds and then publishes a WorldSnapshot, a copy of
+everything the renderer reads, by swapping one attribute (`front`). The
+previous snapshot is kept as `back`. A snapshot is never written by the
+worker after it is published, so the render thread reads it without locks.
+
+Input goes the other way through a queue of (seq, kind, site id, angle,
+speed) commands; each snapshot records the last seq it has applied, so the
+UI knows which of its own aim changes are not in it yet. Simulation events
+are forwarded through a second queue, in order, tagged with the tick of the
+first snapshot that shows their effect; drain_events() hands out only those
+the render thread's snapshot already covers.
+"""
+import collections, copy, queue, threading, time
+import numpy as np
+from settings import SIM_STEP, MAX_FRAME_TIME, TRAIL_LENGTH, SNAPSHOT_TRAIL_POINTS
+from sim import Simulation
+from ephemeris import Ephemeris
+
+class SwarmView:
+    """Read-only copy of a RocketSwarm with the same drawing interface
+    (rockets, pos/prev_pos/vel rows, trail_count, trail_points) but only the
+    newest SNAPSHOT_TRAIL_POINTS trail points per rocket."""
+    def __init__(self, swarm, tail=SNAPSHOT_TRAIL_POINTS):
+        n = len(swarm)
+        self.pos = swarm.pos[:n].copy()
+        self.vel = swarm.vel[:n].copy()
+        self.prev_pos = swarm.prev_pos[:n].copy()
+        self.trail_count = swarm.trail_count[:n].copy()
+        self.tail = tail
+        idx = (self.trail_count[:, None] - tail + np.arange(tail)) % TRAIL_LENGTH
+        self.trail = swarm.trail[np.arange(n)[:, None], idx]   # (n, tail, 2), oldest first
+        self.rockets = []
+        for i, r in enumerate(swarm.rockets):
+            c = copy.copy(r)
+            c.pos, c.vel, c.prev_pos = self.pos[i], self.vel[i], self.prev_pos[i]
+            self.rockets.append(c)
+
+    def __len__(self):
+        return len(self.rockets)
+
+    def __iter__(self):
+        return iter(self.rockets)
+
+    def trail_points(self, i, since=0):
+        count = int(self.trail_count[i])
+        first = count - self.tail            # recorded index of self.trail[i, 0]
+        start = max(since, first, 0)
+        return self.trail[i, start - first:]
+
+class WorldSnapshot:
+    """One tick of a Simulation as the renderer sees it.
+
+    Planets and launch sites are shallow copies (sites re-parented to the
+    copied planet), so entity draw/get_world_pos code works on them as is.
+    """
+    current_player = Simulation.current_player
+    _scores = Simulation._scores
+
+    def __init__(self, sim, input_seq=0):
+        self.tick = sim.tick
+        self.t_sim = sim.t_sim
+        self.players = sim.players
+        self.turn_index = sim.turn_index
+        self.game_over = sim.game_over
+        self.winner = sim.winner
+        self.input_seq = input_seq          # last worker input applied before this tick
+        self.planets = []
+        self.sites = {}
+        for p in sim.planets:
+            pc = copy.copy(p)
+            pc.sites = []
+            for s in p.sites:
+                sc = copy.copy(s)
+                sc.planet = pc
+                pc.sites.append(sc)
+                self.sites[s.id] = sc
+            self.planets.append(pc)
+        self.ephemeris = Ephemeris(self.planets)
+        self.integrator = sim.integrator
+        self.rockets = SwarmView(sim.rockets)
+        self.queued_shot_count = sim.queued_shot_count
+        self.scoreboard = sim.scoreboard.copy()
+        self.published = time.perf_counter()
+
+class SimWorker:
+    """Steps `sim` at 1/SIM_STEP ticks per second on a daemon thread."""
+    def __init__(self, sim, step=SIM_STEP):
+        self.sim = sim
+        self.step = step
+        self.inputs = queue.SimpleQueue()
+        self.events = queue.SimpleQueue()   # (tick, event)
+        self._held = collections.deque()    # drained but newer than the caller's snapshot
+        self.submitted = 0        # last input seq handed out (render thread only)
+        self._applied = 0         # last input seq applied (worker thread only)
+        self.front = WorldSnapshot(sim)
+        self.back = self.front
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sim", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def submit(self, kind, site_id, angle_offset, speed):
+        """Queue an input for the next tick: "aim" sets a site's planned aim,
+        "shot" queues a shot. Returns the input's seq."""
+        self.submitted += 1
+        self.inputs.put((self.submitted, kind, site_id, angle_offset, speed))
+        return self.submitted
+
+    def drain_events(self, tick):
+        """Events up to and including snapshot tick `tick`, in order; newer
+        ones are kept for the call that has their snapshot (render thread only)."""
+        while True:
+            try:
+                self._held.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        events = []
+        while self._held and self._held[0][0] <= tick:
+            events.append(self._held.popleft()[1])
+        return events
+
+    def _apply_inputs(self):
+        """Apply queued inputs; returns the events they raised."""
+        events = []
+        while True:
+            try:
+                seq, kind, site_id, ang, spd = self.inputs.get_nowait()
+            except queue.Empty:
+                return events
+            site = self.sim.sites[site_id]
+            if kind == "aim":
+                site.planned_angle_offset, site.planned_speed = ang, spd
+            elif kind == "shot":
+                # sent from an older snapshot: the turn may have passed since
+                own = site.owner == self.sim.current_player().name
+                if not own or not self.sim.queue_shot(site, ang, spd):
+                    events.append(("shot_rejected", site))
+            self._applied = seq
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while not self._stop.is_set():
+            events = self._apply_inputs()
+            self.sim.step()
+            events += self.sim.drain_events()
+            snap = WorldSnapshot(self.sim, self._applied)
+            for ev in events:
+                self.events.put((snap.tick, ev))
+            self.back, self.front = self.front, snap
+
+            next_tick += self.step
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -MAX_FRAME_TIME:
+                next_tick = time.perf_counter()   # too far behind: drop the backlog